@@ -2,8 +2,14 @@
 用户登录命令模块
 '''
 from dataclasses import dataclass
+from typing import Optional
 
 from app.domain.user.repository import UserRepository
+from app.domain.user.password import PasswordHasher
+from app.domain.user.session import SessionTokenService
+from app.domain.user.events import UserLoggedIn
+from app.domain.shared.events import EventPublisher
+from app.domain.shared.vo import UserID
 from app.application.common.exception import AuthError,ValidationError
 
 @dataclass
@@ -21,13 +27,23 @@ class LoginUserResult:
     '''
     user_id: int
     username: str
+    access_token: Optional[str] = None
+    expires_in: Optional[int] = None
 
 class LoginUserHandler:
     '''
     用户登录命令处理器
     '''
-    def __init__(self,user_repository:UserRepository):
+    def __init__(
+            self,
+            user_repository:UserRepository,
+            password_hasher:PasswordHasher,
+            event_publisher:Optional[EventPublisher] = None,
+            token_service:Optional[SessionTokenService] = None):
         self.user_repository = user_repository
+        self.password_hasher = password_hasher
+        self.event_publisher = event_publisher
+        self.token_service = token_service
 
     async def handle(self, command:LoginUserCommand) -> LoginUserResult:
         '''
@@ -41,17 +57,30 @@ class LoginUserHandler:
         if not command.password or not command.password.strip():
             raise ValidationError("密码不能为空")
 
-        # 查找用户
-        user = await self.user_repository.find_by_username(command.username)
+        # 只查询ID和密码哈希
+        credentials = await self.user_repository.find_credentials(command.username)
 
-        if not user:
+        if not credentials:
             raise AuthError("用户名或者密码错误")
 
-        if not user.verify_password(command.password):
+        if not await credentials.verify_password(command.password, self.password_hasher):
             raise AuthError("用户名或者密码错误")
-        
 
-        return LoginUserResult(
-            user_id=user.id.value if user.id else 0,
-            username=user.username
-        )
\ No newline at end of file
+        # 旧哈希（明文或旧参数）在登录成功时透明升级，此时才需要完整的用户实体
+        if self.password_hasher.needs_rehash(credentials.password):
+            user = await self.user_repository.find_by_id(UserID(credentials.user_id))
+            if user:
+                user.change_password(await self.password_hasher.hash(command.password))
+                await self.user_repository.save(user)
+
+        if self.event_publisher:
+            self.event_publisher.publish([UserLoggedIn(user_id=credentials.user_id, username=command.username)])
+
+        result = LoginUserResult(
+            user_id=credentials.user_id,
+            username=command.username
+        )
+        if self.token_service:
+            result.access_token = self.token_service.issue(credentials.user_id, command.username)
+            result.expires_in = self.token_service.ttl
+        return result
\ No newline at end of file
@@ -1,6 +1,10 @@
 from dataclasses import dataclass
+from typing import Optional
 
-from app.domain.user.repository import UserRepository
+from app.domain.user.repository import DuplicateUsernameError, UserRepository
+from app.domain.user.password import PasswordHasher
+from app.domain.user.events import UserRegistered
+from app.domain.shared.events import EventPublisher
 from app.domain.user.entity import User
 from app.application.common.exception import DuplicateError,ValidationError
 
@@ -24,8 +28,14 @@ class RegisterUserHandler:
     '''
     用户注册处理器
     '''
-    def __init__(self,user_repository:UserRepository):
+    def __init__(
+            self,
+            user_repository:UserRepository,
+            password_hasher:PasswordHasher,
+            event_publisher:Optional[EventPublisher] = None):
         self.user_repository = user_repository
+        self.password_hasher = password_hasher
+        self.event_publisher = event_publisher
     
     async def handle(self, command:RegisterUserCommand) -> RegisterUserResult:
         '''
@@ -46,12 +56,20 @@ class RegisterUserHandler:
         user = User(
             id = None,
             username = command.username,
-            password = command.password
+            password = await self.password_hasher.hash(command.password)
         )
-        # 保存用户
-        saved_user = await self.user_repository.save(user)
+        # 保存用户，并发注册同名用户时由唯一约束兜底
+        try:
+            saved_user = await self.user_repository.save(user)
+        except DuplicateUsernameError:
+            raise DuplicateError("用户名已存在")
+
+        # save返回时已提交，此后的副作用交给事件订阅者异步处理
+        user_id = saved_user.id.value if saved_user.id else 0
+        if self.event_publisher:
+            self.event_publisher.publish([UserRegistered(user_id=user_id, username=saved_user.username)])
 
         return RegisterUserResult(
-            user_id = saved_user.id.value if saved_user.id else 0,
+            user_id = user_id,
             username = saved_user.username
         )
\ No newline at end of file
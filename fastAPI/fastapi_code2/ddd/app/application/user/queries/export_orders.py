@@ -0,0 +1,40 @@
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+from app.domain.order.repository import OrderRepository
+from app.domain.shared.vo import UserID
+from app.application.common.exception import ValidationError
+from app.application.user.queries.get_orders import OrderDTO
+
+
+@dataclass
+class ExportOrdersQuery:
+    '''
+    导出用户全部订单查询
+    '''
+    user_id: int
+    batch_size: int = 500
+
+class ExportOrdersHandler:
+    '''
+    导出订单查询处理器
+    '''
+    def __init__(self, order_repository:OrderRepository):
+        self.order_repository = order_repository
+
+    def validate(self, query:ExportOrdersQuery) -> None:
+        '''
+        校验参数；流式响应一旦开始就无法再返回错误状态码，需要在开始前调用
+        '''
+        if query.user_id <= 0:
+            raise ValidationError('用户ID必须大于0')
+        if query.batch_size <= 0:
+            raise ValidationError('批大小必须大于0')
+
+    async def handle(self, query:ExportOrdersQuery) -> AsyncIterator[list[OrderDTO]]:
+        '''
+        逐批产出订单，调用方消费完一批才会读取下一批
+        '''
+        self.validate(query)
+        async for orders in self.order_repository.iter_by_user(UserID(query.user_id), query.batch_size):
+            yield [OrderDTO.from_entity(order) for order in orders]
@@ -1,7 +1,10 @@
 from dataclasses import dataclass
-from functools import total_ordering
 from typing import Optional,List
 
+from app.domain.order.entity import Order
+from app.domain.order.repository import OrderRepository
+from app.domain.shared.vo import UserID
+from app.application.common.exception import ValidationError
 
 
 @dataclass
@@ -11,7 +14,7 @@ class GetOrdersQuery:
     '''
     user_id: int
     limit:Optional[int] =10
-    offset:Optional[int] =0
+    cursor:Optional[str] =None
 
 @dataclass
 class OrderDTO:
@@ -25,6 +28,20 @@ class OrderDTO:
     created_at:str
     updated_at:str
 
+    @staticmethod
+    def from_entity(order:Order) -> 'OrderDTO':
+        '''
+        由订单实体构造
+        '''
+        return OrderDTO(
+            id=order.id.value,
+            order_number=order.order_number,
+            total_amount=float(order.total_amount),
+            status=order.status,
+            created_at=order.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            updated_at=order.updated_at.strftime('%Y-%m-%d %H:%M:%S')
+        )
+
 @dataclass
 class GetOrdersResult:
     ''''
@@ -32,14 +49,23 @@ class GetOrdersResult:
     '''
     orders:List[OrderDTO]
     total:int
+    next_cursor:Optional[str] = None
 
 class GetOrdersHandler:
     '''
     获取订单查询处理器
     '''
-    def __init__(self):
-        # 这里应该注入订单仓储，为了简化，我们使用模拟数据
-        pass
+    def __init__(self, order_repository:OrderRepository):
+        self.order_repository = order_repository
+
+    async def version(self, user_id:int) -> int:
+        '''
+        用户订单的版本戳，只读取一行汇总数据，用于在执行查询前判断结果是否变化
+        '''
+        if user_id <= 0:
+            raise ValidationError('用户ID必须大于0')
+        return await self.order_repository.version_by_user(UserID(user_id))
+
     async def handle(self, query:GetOrdersQuery) -> GetOrdersResult:
         '''
         处理获取用户订单查询
@@ -47,21 +73,16 @@ class GetOrdersHandler:
         '''
         # 验证输入的参数
         if query.user_id <= 0:
-            raise ValueError('用户ID必须大于0')
+            raise ValidationError('用户ID必须大于0')
         if query.limit <= 0 or query.limit > 100:
-            raise ValueError('限制数量必须大于0且小于100')
-        if query.offset < 0:
-            raise ValueError('偏移量不能为负数')
-        
-        # 模拟订单数据
-        orders = [
-            OrderDTO(id=1, order_number='ORD-001', total_amount=99.99, status='待处理', created_at='2030-05-01 10:00:00', updated_at='2023-05-01 10:00:00'),
-            OrderDTO(id=2, order_number='ORD-002', total_amount=149.99, status='已发货', created_at='2030-05-02 11:00:00', updated_at='2023-05-02 11:00:00'),
-            OrderDTO(id=3, order_number='ORD-003', total_amount=199.99, status='已完成', created_at='2030-05-03 12:00:00', updated_at='2023-05-03 12:00:00'),
-        ]
-        # 应用分页
-        start = query.offset or 0
-        end = start + (query.limit or 2)
-        paginated_orders = orders[start:end]
-        
-        return GetOrdersResult(orders=paginated_orders, total=len(orders))
+            raise ValidationError('限制数量必须大于0且小于100')
+
+        user_id = UserID(query.user_id)
+        try:
+            page = await self.order_repository.find_page_by_user(user_id, query.limit, query.cursor)
+        except ValueError as e:
+            raise ValidationError(str(e))
+        total = await self.order_repository.count_by_user(user_id)
+
+        orders = [OrderDTO.from_entity(order) for order in page.orders]
+        return GetOrdersResult(orders=orders, total=total, next_cursor=page.next_cursor)
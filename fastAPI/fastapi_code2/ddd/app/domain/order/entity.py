@@ -0,0 +1,27 @@
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+
+from ..shared.vo import OrderID, UserID
+
+@dataclass
+class Order:
+    '''
+    订单实体类
+    '''
+    id: Optional[OrderID]
+    user_id: UserID
+    order_number: str
+    total_amount: Decimal
+    status: str
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    def __post_init__(self):
+        if not self.order_number:
+            raise ValueError("订单号不能为空")
+        if self.total_amount < 0:
+            raise ValueError("订单金额不能为负数")
+        if not self.status:
+            raise ValueError("订单状态不能为空")
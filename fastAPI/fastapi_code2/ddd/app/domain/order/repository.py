@@ -0,0 +1,62 @@
+'''
+订单仓储接口
+'''
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+from .entity import Order
+from ..shared.vo import OrderID, UserID
+
+@dataclass
+class OrderPage:
+    '''
+    订单分页结果，next_cursor为None表示没有下一页
+    '''
+    orders: list[Order]
+    next_cursor: Optional[str]
+
+class OrderRepository(ABC):
+
+    @abstractmethod
+    async def save(self, order:Order) -> Order:
+        '''保存订单'''
+        pass
+
+    @abstractmethod
+    async def delete(self, order_id:OrderID) -> bool:
+        '''删除订单'''
+        pass
+
+    @abstractmethod
+    async def find_page_by_user(self, user_id:UserID, limit:int, cursor:Optional[str] = None) -> OrderPage:
+        '''
+        按创建时间倒序分页查询用户订单
+
+        cursor为上一页返回的不透明游标，翻到第N页与第1页代价相同
+        '''
+        pass
+
+    @abstractmethod
+    def iter_by_user(self, user_id:UserID, batch_size:int = 500) -> AsyncIterator[list[Order]]:
+        '''
+        按创建时间倒序逐批迭代用户的全部订单，每批最多batch_size条，内存占用与订单总数无关
+        '''
+        pass
+
+    @abstractmethod
+    async def count_by_user(self, user_id:UserID) -> int:
+        '''统计用户订单数量（读取增量维护的计数，O(1)）'''
+        pass
+
+    @abstractmethod
+    async def version_by_user(self, user_id:UserID) -> int:
+        '''
+        读取用户订单的版本戳，该用户的订单每次新增、修改或删除后都会变大
+        '''
+        pass
+
+    @abstractmethod
+    async def rebuild_counters(self) -> int:
+        '''按订单表全量重建用户订单计数，返回重建的用户数'''
+        pass
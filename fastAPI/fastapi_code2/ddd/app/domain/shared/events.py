@@ -0,0 +1,27 @@
+'''
+领域事件定义模块
+'''
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+
+@dataclass(frozen=True)
+class DomainEvent:
+    '''
+    领域事件基类
+    '''
+    occurred_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc), kw_only=True)
+
+
+class EventPublisher(ABC):
+    '''
+    领域事件发布接口
+
+    publish只负责投递，不等待订阅方执行完毕；必须在主写入提交之后调用
+    '''
+
+    @abstractmethod
+    def publish(self, events:list[DomainEvent]) -> None:
+        '''发布事件'''
+        pass
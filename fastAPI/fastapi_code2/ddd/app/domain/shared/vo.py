@@ -3,7 +3,7 @@
 '''
 from dataclasses import dataclass
  
-@dataclass(frozen=True)   # dataclass会自动实现__init__()和__eq__()方法 frozen=True使实例不可变
+@dataclass(frozen=True, slots=True)   # dataclass会自动实现__init__()和__eq__()方法 frozen=True使实例不可变，slots=True省去实例__dict__
 class UserID:
     '''
     用户ID值对象
@@ -15,4 +15,18 @@ class UserID:
         初始化检查
         '''
         if self.value < 0:
-            raise ValueError('用户ID不能小于0')
\ No newline at end of file
+            raise ValueError('用户ID不能小于0')
+
+@dataclass(frozen=True)
+class OrderID:
+    '''
+    订单ID值对象
+    '''
+    value: int
+
+    def __post_init__(self):
+        '''
+        初始化检查
+        '''
+        if self.value < 0:
+            raise ValueError('订单ID不能小于0')
@@ -2,8 +2,9 @@ from dataclasses import dataclass
 from typing import Optional
 
 from ..shared.vo import UserID
+from .password import PasswordHasher
 
-@dataclass
+@dataclass(slots=True)
 class User:
     '''
     用户实体类
@@ -18,11 +19,11 @@ class User:
         if not self.password:
             raise ValueError("密码不能为空")
     
-    def verify_password(self, password: str) -> bool:
+    async def verify_password(self, password: str, hasher: PasswordHasher) -> bool:
         '''
-        验证密码是否正确
+        验证密码是否正确（password字段保存的是哈希）
         '''
-        return self.password == password
+        return await hasher.verify(password, self.password)
     
     def change_password(self, new_password: str) ->None:
         '''
@@ -30,4 +31,4 @@ class User:
         '''
         if not new_password:
             raise ValueError("密码不能为空")
-        self.password = new_password
\ No newline at end of file
+        self.password = new_password
@@ -0,0 +1,22 @@
+'''
+用户领域事件
+'''
+from dataclasses import dataclass
+
+from ..shared.events import DomainEvent
+
+@dataclass(frozen=True)
+class UserRegistered(DomainEvent):
+    '''
+    用户已注册
+    '''
+    user_id: int
+    username: str
+
+@dataclass(frozen=True)
+class UserLoggedIn(DomainEvent):
+    '''
+    用户已登录
+    '''
+    user_id: int
+    username: str
@@ -0,0 +1,27 @@
+'''
+密码哈希领域服务接口
+'''
+from abc import ABC, abstractmethod
+
+
+class PasswordHasher(ABC):
+    '''
+    密码哈希服务
+
+    KDF计算属于CPU密集型操作，实现方需要保证不阻塞事件循环
+    '''
+
+    @abstractmethod
+    async def hash(self, password:str) -> str:
+        '''计算密码哈希'''
+        pass
+
+    @abstractmethod
+    async def verify(self, password:str, hashed:str) -> bool:
+        '''校验密码是否与哈希匹配'''
+        pass
+
+    @abstractmethod
+    def needs_rehash(self, hashed:str) -> bool:
+        '''判断已存储的哈希是否需要按当前参数重新计算（旧算法、旧参数或明文）'''
+        pass
@@ -2,16 +2,40 @@
 用户仓储接口
 '''
 from abc import ABC, abstractmethod
-from typing import Optional
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
 
 from .entity import User
+from .password import PasswordHasher
 from ..shared.vo import UserID
 
+@dataclass(frozen=True, slots=True)
+class UserCredentials:
+    '''
+    登录所需的用户投影：ID和密码哈希
+    '''
+    user_id: int
+    password: str
+
+    async def verify_password(self, password:str, hasher:PasswordHasher) -> bool:
+        '''
+        验证密码是否正确
+        '''
+        return await hasher.verify(password, self.password)
+
+class DuplicateUsernameError(Exception):
+    '''
+    用户名已被占用，仓储在用户名唯一约束冲突时抛出（批量保存时可能无法确定是哪个用户名）
+    '''
+    def __init__(self, username:Optional[str] = None):
+        self.username = username
+        super().__init__(f'用户名已存在: {username}' if username else '用户名已存在')
+
 class UserRepository(ABC):
 
     @abstractmethod
     async def save(self, user:User) -> User:
-        '''保存用户'''
+        '''保存用户，用户名冲突时抛出DuplicateUsernameError'''
         pass
 
     @abstractmethod
@@ -24,6 +48,11 @@ class UserRepository(ABC):
         '''通过用户名查找用户'''
         pass
 
+    @abstractmethod
+    async def find_credentials(self, username:str) -> Optional[UserCredentials]:
+        '''通过用户名只查询登录需要的ID和密码哈希'''
+        pass
+
     @abstractmethod
     async def exists_by_username(self, username:str) -> bool:
         '''检查用户名是否存在'''
@@ -35,4 +64,24 @@ class UserRepository(ABC):
     @abstractmethod
     async def find_all(self) -> list[User]:
         '''查找所有用户'''
+        pass
+
+    @abstractmethod
+    def iter_all(self, batch_size:int = 500) -> AsyncIterator[User]:
+        '''分批流式读取全部用户，不一次性加载整张表'''
+        pass
+
+    @abstractmethod
+    async def save_many(self, users:list[User]) -> list[User]:
+        '''批量保存用户（单个事务），按传入顺序返回保存后的用户；任一用户名冲突时整批回滚并抛出DuplicateUsernameError'''
+        pass
+
+    @abstractmethod
+    async def find_by_ids(self, user_ids:list[UserID]) -> list[User]:
+        '''批量通过ID查找用户，按传入顺序返回，不存在的ID被忽略'''
+        pass
+
+    @abstractmethod
+    async def delete_many(self, user_ids:list[UserID]) -> int:
+        '''批量删除用户，返回删除的数量'''
         pass
\ No newline at end of file
@@ -0,0 +1,47 @@
+'''
+会话令牌领域服务接口
+'''
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True, slots=True)
+class SessionClaims:
+    '''
+    令牌中携带的会话信息，校验通过后即可信任，无需再查询用户表
+    '''
+    user_id: int
+    username: str
+    issued_at: int
+    expires_at: int
+    token_id: str
+
+
+class SessionTokenService(ABC):
+    '''
+    无状态会话令牌服务
+
+    签发和校验都只做本地计算，实现方需要保证校验足够廉价，可以在每个请求上执行
+    '''
+
+    @property
+    @abstractmethod
+    def ttl(self) -> int:
+        '''令牌有效期（秒）'''
+        pass
+
+    @abstractmethod
+    def issue(self, user_id:int, username:str) -> str:
+        '''签发令牌'''
+        pass
+
+    @abstractmethod
+    def verify(self, token:str) -> Optional[SessionClaims]:
+        '''校验令牌，签名错误、已过期或已吊销时返回None'''
+        pass
+
+    @abstractmethod
+    def revoke(self, claims:SessionClaims) -> None:
+        '''吊销令牌，在其过期前拒绝后续校验'''
+        pass
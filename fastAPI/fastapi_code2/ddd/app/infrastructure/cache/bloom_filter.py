@@ -0,0 +1,56 @@
+'''
+布隆过滤器
+'''
+import hashlib
+import math
+
+
+class BloomFilter:
+    '''
+    基于bytearray的布隆过滤器
+
+    might_contain返回False时元素一定不存在；返回True时可能存在（误判率约为fp_rate）。
+    k个哈希位置由blake2b摘要拆成的两个64位整数做双重哈希得到。
+    '''
+    def __init__(self, capacity:int, fp_rate:float = 0.01):
+        if capacity <= 0:
+            raise ValueError('布隆过滤器容量必须大于0')
+        if not 0 < fp_rate < 1:
+            raise ValueError('误判率必须在0和1之间')
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    @property
+    def size_in_bytes(self) -> int:
+        '''位数组占用的字节数'''
+        return len(self._bits)
+
+    def _positions(self, item:str):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        num_bits = self.num_bits
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % num_bits
+
+    def add(self, item:str) -> None:
+        '''加入元素'''
+        bits = self._bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def might_contain(self, item:str) -> bool:
+        '''判断元素是否可能存在'''
+        bits = self._bits
+        for position in self._positions(item):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __contains__(self, item:str) -> bool:
+        return self.might_contain(item)
@@ -0,0 +1,118 @@
+'''
+带过期时间的LRU缓存
+'''
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional
+
+
+_MISSING = object()
+
+
+@dataclass
+class CacheStats:
+    '''
+    缓存统计信息
+    '''
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        '''
+        命中率
+        '''
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class TTLLRUCache:
+    '''
+    有界LRU缓存，每个条目带TTL
+
+    只在事件循环线程中使用，不做加锁处理。
+    on_evict在条目因容量淘汰或过期被移除时调用（pop/discard_where/clear不触发）
+    '''
+    def __init__(
+            self,
+            max_size: int = 1024,
+            ttl: float = 60.0,
+            clock: Callable[[], float] = time.monotonic,
+            on_evict: Optional[Callable[[Hashable, Any], None]] = None):
+        if max_size <= 0:
+            raise ValueError('缓存容量必须大于0')
+        if ttl <= 0:
+            raise ValueError('缓存过期时间必须大于0')
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._clock = clock
+        self._on_evict = on_evict
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = _MISSING) -> Any:
+        '''
+        读取缓存，未命中时返回default（未传入时返回MISSING哨兵）
+        '''
+        entry = self._data.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._data[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            if self._on_evict:
+                self._on_evict(key, value)
+            return default
+        self._data.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        '''
+        写入缓存，超出容量时淘汰最久未使用的条目；ttl为空时使用缓存的默认过期时间
+        '''
+        self._data[key] = (self._clock() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            evicted_key, (_, evicted) = self._data.popitem(last=False)
+            self.stats.evictions += 1
+            if self._on_evict:
+                self._on_evict(evicted_key, evicted)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        '''
+        删除缓存条目，返回原值（不检查是否过期）
+        '''
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def discard_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        '''
+        删除所有满足条件的条目，返回删除数量
+        '''
+        keys = [key for key, (_, value) in self._data.items() if predicate(key, value)]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        '''
+        清空缓存
+        '''
+        self._data.clear()
+
+    @staticmethod
+    def is_missing(value: Any) -> bool:
+        '''
+        判断get的返回值是否为未命中
+        '''
+        return value is _MISSING
@@ -0,0 +1,154 @@
+'''
+组提交写队列
+'''
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Generic, Optional, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+@dataclass
+class BatchStats:
+    '''
+    批量写入统计
+    '''
+    batches: int = 0
+    rows: int = 0
+    max_batch_size: int = 0
+    flush_seconds: float = 0.0
+    wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    # 批大小分布：上界 -> 批次数
+    size_buckets: dict[int, int] = field(default_factory=lambda: {1: 0, 4: 0, 16: 0, 64: 0, 256: 0, 1024: 0})
+
+    @property
+    def avg_batch_size(self) -> float:
+        '''平均批大小'''
+        return self.rows / self.batches if self.batches else 0.0
+
+    def record(self, size:int, flush_seconds:float, waits:list[float]) -> None:
+        self.batches += 1
+        self.rows += size
+        self.max_batch_size = max(self.max_batch_size, size)
+        self.flush_seconds += flush_seconds
+        self.wait_seconds += sum(waits)
+        self.max_wait_seconds = max(self.max_wait_seconds, max(waits))
+        for bound in self.size_buckets:
+            if size <= bound:
+                self.size_buckets[bound] += 1
+                break
+
+
+class GroupCommitQueue(Generic[T, R]):
+    '''
+    收集并发提交的写请求，凑满max_batch条或等待max_delay秒后一次性交给flush处理
+
+    flush接收一批条目，按顺序返回每条的结果或异常对象，异常会抛给对应的调用方。
+    后台只有一个工作协程，同一时刻最多一个批次在写，正好匹配SQLite的单写者模型；
+    写入期间到达的请求自然累积到下一批。
+    工作协程由start创建并继承调用方的contextvars，应在启动阶段调用，而不是在某个请求里，
+    否则之后所有批次的查询都会记到那个请求的统计上；工作协程意外退出时所有未完成的写请求都会收到异常。
+    '''
+    def __init__(
+            self,
+            flush:Callable[[list[T]], Awaitable[list[Any]]],
+            max_batch:int = 100,
+            max_delay:float = 0.005):
+        if max_batch <= 0:
+            raise ValueError('批大小必须大于0')
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.stats = BatchStats()
+        self._flush = flush
+        self._pending: list[tuple[T, asyncio.Future, float]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def start(self) -> None:
+        '''启动后台工作协程'''
+        if self._closed:
+            raise RuntimeError('写队列已关闭')
+        if self._worker is None:
+            self._wakeup = asyncio.Event()
+            self._full = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+
+    async def submit(self, item:T) -> R:
+        '''提交一条写请求，等待其所在批次提交后返回结果'''
+        if self._closed:
+            raise RuntimeError('写队列已关闭')
+        if self._worker is None:
+            raise RuntimeError('写队列未启动')
+        if self._worker.done():
+            raise RuntimeError('写队列已停止')
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future, time.perf_counter()))
+        self._wakeup.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+        return await future
+
+    async def _run(self) -> None:
+        try:
+            await self._loop()
+        finally:
+            # 正常关闭时队列已清空；被取消或出现未捕获的异常时，让等待中的调用方立即失败而不是永远挂起
+            pending, self._pending = self._pending, []
+            self._fail(pending)
+
+    async def _loop(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            if not self._pending:
+                self._wakeup.clear()
+                if self._closed:
+                    return
+                continue
+            if self.max_delay > 0 and len(self._pending) < self.max_batch and not self._closed:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_delay)
+                except asyncio.TimeoutError:
+                    pass
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            if len(self._pending) < self.max_batch:
+                self._full.clear()
+            await self._commit(batch)
+
+    async def _commit(self, batch:list[tuple[T, asyncio.Future, float]]) -> None:
+        start = time.perf_counter()
+        try:
+            results = await self._flush([item for item, _, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        except BaseException:
+            self._fail(batch)
+            raise
+        end = time.perf_counter()
+        self.stats.record(len(batch), end - start, [end - enqueued for _, _, enqueued in batch])
+        for (_, future, _), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    @staticmethod
+    def _fail(entries:list[tuple[T, asyncio.Future, float]]) -> None:
+        for _, future, _ in entries:
+            if not future.done():
+                future.set_exception(RuntimeError('写队列已停止'))
+
+    async def close(self) -> None:
+        '''写完剩余的请求后停止后台协程'''
+        self._closed = True
+        if self._worker is None:
+            return
+        self._wakeup.set()
+        self._full.set()
+        await self._worker
@@ -0,0 +1,119 @@
+'''
+Tortoise查询计时与SQL检查
+'''
+import functools
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+# 客户端上所有最终执行SQL的方法
+QUERY_METHODS = ('execute_query', 'execute_query_dict', 'execute_insert', 'execute_many', 'execute_script')
+
+
+@dataclass
+class QueryStats:
+    '''
+    查询次数与耗时
+    '''
+    queries: int = 0
+    seconds: float = 0.0
+
+    def record(self, seconds:float) -> None:
+        self.queries += 1
+        self.seconds += seconds
+
+
+@dataclass
+class QueryInspector:
+    '''
+    记录一个请求内每种SQL形状的执行次数和读取的行数，用于发现N+1查询
+    '''
+    queries: int = 0
+    rows: int = 0
+    shapes: Counter = field(default_factory=Counter)
+
+    def record(self, sql:str, result:Any) -> None:
+        self.queries += 1
+        self.rows += _row_count(result)
+        self.shapes[normalize_sql(sql)] += 1
+
+    def repeated(self, threshold:int) -> list[tuple[str, int]]:
+        '''执行次数达到threshold的SQL形状，按次数降序'''
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|(?<![$\w])\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r'\(\s*(?:\?|\$\d+|%s)(?:\s*,\s*(?:\?|\$\d+|%s))*\s*\)')
+
+@functools.lru_cache(maxsize=1024)
+def normalize_sql(sql:str) -> str:
+    '''
+    把SQL中的字面量替换为?、把IN (?, ?, ...)折叠为IN (...)，得到与参数无关的形状
+    '''
+    shape = _LITERALS.sub('?', sql)
+    shape = _PLACEHOLDER_LISTS.sub('(...)', shape)
+    return ' '.join(shape.split())
+
+def _row_count(result:Any) -> int:
+    # execute_query返回(影响行数, 行列表)，execute_query_dict返回行列表，其余方法不返回行
+    if isinstance(result, tuple) and len(result) == 2 and isinstance(result[1], (list, tuple)):
+        return len(result[1])
+    if isinstance(result, list):
+        return len(result)
+    return 0
+
+
+# 当前请求的查询统计，由中间件在请求开始时设置；请求内派生的任务会继承
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar('current_query_stats', default=None)
+# 当前请求的SQL检查器，只有开启检查时中间件才会设置
+current_query_inspector: ContextVar[Optional[QueryInspector]] = ContextVar('current_query_inspector', default=None)
+# 本进程全部查询（包括组提交、事件订阅等后台任务）的累计统计
+total_query_stats = QueryStats()
+
+# 子类方法可能调用父类实现，只统计最外层的一次
+_in_query: ContextVar[bool] = ContextVar('_in_query', default=False)
+
+
+def _instrument(method):
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        if _in_query.get():
+            return await method(self, *args, **kwargs)
+        token = _in_query.set(True)
+        start = time.perf_counter()
+        result = None
+        try:
+            result = await method(self, *args, **kwargs)
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            _in_query.reset(token)
+            total_query_stats.record(elapsed)
+            stats = current_query_stats.get()
+            if stats is not None:
+                stats.record(elapsed)
+            inspector = current_query_inspector.get()
+            if inspector is not None and args:
+                inspector.record(args[0], result)
+    wrapper.__instrumented__ = True
+    return wrapper
+
+def instrument_db_clients() -> None:
+    '''
+    给所有已加载的Tortoise客户端类（含事务包装类）的查询方法加上计时，重复调用无副作用
+
+    Tortoise没有查询级的钩子，只能包装客户端方法；需在Tortoise.init之后调用，此时后端模块已导入。
+    '''
+    pending = [BaseDBAsyncClient]
+    while pending:
+        cls = pending.pop()
+        pending.extend(cls.__subclasses__())
+        for name in QUERY_METHODS:
+            method = cls.__dict__.get(name)
+            if method is not None and not getattr(method, '__instrumented__', False):
+                setattr(cls, name, _instrument(method))
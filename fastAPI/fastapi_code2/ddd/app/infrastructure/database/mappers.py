@@ -1,9 +1,26 @@
 '''
 实体与ORM映射器
 '''
-from ..database.orm_models import UserORM
+from ..database.orm_models import UserORM, OrderORM
 from app.domain.user.entity import User
-from app.domain.shared.vo import UserID
+from app.domain.order.entity import Order
+from app.domain.shared.vo import UserID, OrderID
+
+# 数据库中的行在写入时已经过实体校验，读取时跳过__init__/__post_init__直接填充槽位
+_new = object.__new__
+_set = object.__setattr__
+
+def _trusted_user_id(value:int) -> UserID:
+    user_id = _new(UserID)
+    _set(user_id, 'value', value)
+    return user_id
+
+def _trusted_user(id:int, username:str, password:str) -> User:
+    user = _new(User)
+    user.id = _trusted_user_id(id)
+    user.username = username
+    user.password = password
+    return user
 
 class UserMapper:
     '''
@@ -20,6 +37,20 @@ class UserMapper:
             password = orm_model.password
         )
     @staticmethod
+    def from_row(row: tuple) -> User:
+        '''
+        由数据库行(id, username, password)直接构建实体，不再校验（仅用于从数据库读出的数据）
+        '''
+        return _trusted_user(*row)
+
+    @staticmethod
+    def from_rows(rows: list[tuple]) -> list[User]:
+        '''
+        批量由数据库行构建实体
+        '''
+        return [_trusted_user(id, username, password) for id, username, password in rows]
+
+    @staticmethod
     def to_orm(user: User) -> UserORM:
         '''
         将实体对象转换为ORM对象
@@ -29,4 +60,55 @@ class UserMapper:
             orm_model.id = user.id.value
         orm_model.username = user.username
         orm_model.password = user.password
-        return orm_model
\ No newline at end of file
+        return orm_model
+
+    @staticmethod
+    def to_entities(orm_models: list[UserORM]) -> list[User]:
+        '''
+        批量将ORM对象转换为实体对象
+        '''
+        to_entity = UserMapper.to_entity
+        return [to_entity(orm_model) for orm_model in orm_models]
+
+    @staticmethod
+    def to_orms(users: list[User]) -> list[UserORM]:
+        '''
+        批量将实体对象转换为ORM对象
+        '''
+        to_orm = UserMapper.to_orm
+        return [to_orm(user) for user in users]
+
+class OrderMapper:
+    '''
+    订单映射器
+    '''
+    @staticmethod
+    def to_entity(orm_model: OrderORM) -> Order:
+        '''
+        将ORM对象转换为实体对象
+        '''
+        return Order(
+            id = OrderID(orm_model.id) if orm_model.id else None,
+            user_id = UserID(orm_model.user_id),
+            order_number = orm_model.order_number,
+            total_amount = orm_model.total_amount,
+            status = orm_model.status,
+            created_at = orm_model.created_at,
+            updated_at = orm_model.updated_at
+        )
+
+    @staticmethod
+    def to_orm(order: Order) -> OrderORM:
+        '''
+        将实体对象转换为ORM对象
+        '''
+        orm_model = OrderORM()
+        if order.id:
+            orm_model.id = order.id.value
+        orm_model.user_id = order.user_id.value
+        orm_model.order_number = order.order_number
+        orm_model.total_amount = order.total_amount
+        orm_model.status = order.status
+        if order.created_at:
+            orm_model.created_at = order.created_at
+        return orm_model
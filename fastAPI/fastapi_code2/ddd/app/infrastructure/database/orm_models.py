@@ -16,4 +16,35 @@ class UserORM(Model):
     updated_at = fields.DatetimeField(auto_now=True)
 
     class Meta:
-        table = 'users'
\ No newline at end of file
+        table = 'users'
+
+class OrderORM(Model):
+    '''
+    订单表
+    '''
+    id = fields.IntField(pk=True)
+    user_id = fields.IntField()
+    order_number = fields.CharField(max_length=64, unique=True)
+    total_amount = fields.DecimalField(max_digits=12, decimal_places=2)
+    status = fields.CharField(max_length=32)
+    created_at = fields.DatetimeField(auto_now_add=True)
+    updated_at = fields.DatetimeField(auto_now=True)
+
+    class Meta:
+        table = 'orders'
+        # 覆盖按用户倒序的游标分页：WHERE user_id=? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC
+        indexes = (('user_id', 'created_at', 'id'),)
+
+class OrderSummaryORM(Model):
+    '''
+    用户订单汇总表，随订单增删在同一事务内维护，避免分页时COUNT(*)
+
+    version在该用户的订单每次写入时递增，作为订单列表的版本戳（ETag）
+    '''
+    user_id = fields.IntField(pk=True, generated=False)
+    order_count = fields.IntField(default=0)
+    version = fields.IntField(default=0)
+    updated_at = fields.DatetimeField(auto_now=True)
+
+    class Meta:
+        table = 'order_summaries'
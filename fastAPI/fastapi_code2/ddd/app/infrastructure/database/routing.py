@@ -0,0 +1,29 @@
+'''
+读写连接路由
+'''
+import itertools
+from typing import Optional
+
+from tortoise import Tortoise
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+
+class DatabaseRouter:
+    '''
+    写操作使用写连接，查询轮询分配到只读连接
+
+    没有配置只读连接时所有操作都走写连接。
+    事务内的查询不要经过for_read：只读连接看不到当前事务尚未提交的数据。
+    '''
+    def __init__(self, write_connection:str = 'default', read_connections:Optional[list[str]] = None):
+        self.write_connection = write_connection
+        self.read_connections = list(read_connections or [])
+        self._next_read = itertools.cycle(self.read_connections or [write_connection])
+
+    def for_write(self) -> BaseDBAsyncClient:
+        '''获取写连接'''
+        return Tortoise.get_connection(self.write_connection)
+
+    def for_read(self) -> BaseDBAsyncClient:
+        '''轮询获取一个只读连接'''
+        return Tortoise.get_connection(next(self._next_read))
@@ -0,0 +1,122 @@
+'''
+数据库表结构版本检查
+'''
+import hashlib
+import logging
+
+from tortoise import Tortoise
+from tortoise.exceptions import OperationalError
+from tortoise.transactions import in_transaction
+from tortoise.utils import get_schema_sql
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION_TABLE = 'schema_version'
+
+# 已有表上新增列的迁移：(表, 列) -> 列定义。generate_schemas不会修改已有表，
+# 模型给已有表加列时在这里登记，ensure_schema在列缺失时执行ALTER TABLE ... ADD COLUMN
+ADDED_COLUMNS: dict[tuple[str, str], str] = {
+    ('order_summaries', 'version'): 'INT NOT NULL DEFAULT 0',
+}
+
+
+class SchemaMismatchError(RuntimeError):
+    '''
+    已有表缺少模型中定义的列，generate_schemas无法修复，需要迁移
+    '''
+    def __init__(self, missing:dict[str, list[str]]):
+        self.missing = missing
+        columns = ', '.join(f'{table}.{column}' for table, names in missing.items() for column in names)
+        super().__init__(f'数据库表结构与模型不一致，缺少列: {columns}')
+
+
+def schema_fingerprint(connection_name:str = 'default') -> str:
+    '''
+    由当前模型生成的建表SQL计算指纹，模型变化时指纹随之变化
+    '''
+    client = Tortoise.get_connection(connection_name)
+    return hashlib.sha256(get_schema_sql(client, safe=True).encode()).hexdigest()
+
+async def table_columns(connection_name:str, table:str) -> set[str]:
+    '''
+    读取数据库中表的实际列名，表不存在时返回空集合
+    '''
+    client = Tortoise.get_connection(connection_name)
+    if client.capabilities.dialect == 'sqlite':
+        rows = await client.execute_query_dict(f'PRAGMA table_info("{table}")')
+        return {row['name'] for row in rows}
+    rows = await client.execute_query_dict(
+        f"SELECT column_name FROM information_schema.columns WHERE table_name = '{table}'"
+    )
+    return {row['column_name'] for row in rows}
+
+async def missing_columns(connection_name:str = 'default') -> dict[str, list[str]]:
+    '''
+    对比模型字段与数据库中的实际列，返回 {表名: [缺少的列]}
+    '''
+    missing = {}
+    for models in Tortoise.apps.values():
+        for model in models.values():
+            meta = model._meta
+            if meta.default_connection != connection_name:
+                continue
+            absent = set(meta.fields_db_projection.values()) - await table_columns(connection_name, meta.db_table)
+            if absent:
+                missing[meta.db_table] = sorted(absent)
+    return missing
+
+async def add_missing_columns(connection_name:str = 'default') -> list[str]:
+    '''
+    对已有表执行ADDED_COLUMNS中登记、但数据库中还没有的加列迁移，返回新增的列
+    '''
+    client = Tortoise.get_connection(connection_name)
+    added = []
+    columns_by_table: dict[str, set[str]] = {}
+    for (table, column), definition in ADDED_COLUMNS.items():
+        if table not in columns_by_table:
+            columns_by_table[table] = await table_columns(connection_name, table)
+        existing = columns_by_table[table]
+        # 表不存在时由generate_schemas按模型整表创建
+        if not existing or column in existing:
+            continue
+        await client.execute_script(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+        existing.add(column)
+        added.append(f'{table}.{column}')
+        logger.info('已为 %s 表新增列 %s', table, column)
+    return added
+
+async def ensure_schema(connection_name:str = 'default') -> bool:
+    '''
+    表结构指纹与schema_version表记录一致时跳过generate_schemas，否则建表并记录新指纹
+
+    返回是否执行了建表。generate_schemas只会创建缺失的表，不会修改已有表：
+    已有表的新增列按ADDED_COLUMNS迁移，之后逐表核对列，仍有缺失时抛出SchemaMismatchError且不记录新指纹，
+    下次启动仍会重新检查。
+    '''
+    client = Tortoise.get_connection(connection_name)
+    fingerprint = schema_fingerprint(connection_name)
+    try:
+        rows = await client.execute_query_dict(f'SELECT fingerprint FROM {SCHEMA_VERSION_TABLE} WHERE id = 1')
+    except OperationalError:
+        rows = []
+    if rows and rows[0]['fingerprint'] == fingerprint:
+        return False
+
+    logger.info('表结构指纹变化，执行generate_schemas')
+    await Tortoise.generate_schemas()
+    await add_missing_columns(connection_name)
+    missing = await missing_columns(connection_name)
+    if missing:
+        raise SchemaMismatchError(missing)
+    await client.execute_script(
+        f'CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} '
+        '(id INTEGER PRIMARY KEY, fingerprint VARCHAR(64) NOT NULL, applied_at TIMESTAMP NOT NULL)'
+    )
+    async with in_transaction(connection_name) as connection:
+        await connection.execute_query(f'DELETE FROM {SCHEMA_VERSION_TABLE} WHERE id = 1')
+        # 指纹是十六进制摘要，可以直接拼入SQL，避免不同驱动的占位符差异
+        await connection.execute_query(
+            f"INSERT INTO {SCHEMA_VERSION_TABLE} (id, fingerprint, applied_at) "
+            f"VALUES (1, '{fingerprint}', CURRENT_TIMESTAMP)"
+        )
+    return True
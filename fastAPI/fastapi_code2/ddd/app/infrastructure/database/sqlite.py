@@ -0,0 +1,100 @@
+'''
+SQLite连接配置与PRAGMA自检
+'''
+import inspect
+import logging
+from typing import Any
+
+from tortoise import Tortoise
+from tortoise.backends.base.config_generator import expand_db_url
+
+logger = logging.getLogger(__name__)
+
+SQLITE_ENGINE = 'tortoise.backends.sqlite'
+READ_CONNECTION_PREFIX = 'read_'
+MODELS = ['app.infrastructure.database.orm_models']
+
+# synchronous / temp_store 查询时返回数字，需要映射回名称再比较
+_SYNCHRONOUS = {0: 'OFF', 1: 'NORMAL', 2: 'FULL', 3: 'EXTRA'}
+_TEMP_STORE = {0: 'DEFAULT', 1: 'FILE', 2: 'MEMORY'}
+
+
+def sqlite_pragmas(settings:Any) -> dict[str, Any]:
+    '''
+    从配置中读取需要在每个连接上执行的PRAGMA
+    '''
+    return {
+        'journal_mode': settings.sqlite_journal_mode,
+        'synchronous': settings.sqlite_synchronous,
+        'mmap_size': settings.sqlite_mmap_size,
+        'cache_size': settings.sqlite_cache_size,
+        'temp_store': settings.sqlite_temp_store,
+        'busy_timeout': settings.sqlite_busy_timeout,
+    }
+
+def build_tortoise_config(db_url:str, pragmas:dict[str, Any], read_connections:int = 0) -> dict:
+    '''
+    生成Tortoise配置；SQLite客户端会把credentials中的额外参数作为PRAGMA在建立连接时执行
+
+    read_connections>0时额外生成read_0..read_n只读连接（PRAGMA query_only），
+    它们与写连接打开同一个WAL文件，读操作互不阻塞也不阻塞写。内存库无法共享，不生成只读连接。
+    '''
+    connection = expand_db_url(db_url)
+    connections = {'default': connection}
+    if connection['engine'] == SQLITE_ENGINE:
+        connection['credentials'].update(pragmas)
+        if connection['credentials']['file_path'] != ':memory:':
+            for i in range(read_connections):
+                read_connection = expand_db_url(db_url)
+                read_connection['credentials'].update(pragmas, query_only='ON')
+                connections[f'{READ_CONNECTION_PREFIX}{i}'] = read_connection
+    return {
+        'connections': connections,
+        'apps': {'models': {'models': MODELS, 'default_connection': 'default'}},
+    }
+
+def tortoise_init_options() -> dict[str, Any]:
+    '''
+    Tortoise.init的额外参数
+
+    Tortoise 1.x 把连接保存在contextvar中，在lifespan任务里初始化的连接对服务器创建的请求任务不可见，
+    需要开启全局回退；旧版本没有该参数，连接本身就是全局状态
+    '''
+    if '_enable_global_fallback' in inspect.signature(Tortoise.init).parameters:
+        return {'_enable_global_fallback': True}
+    return {}
+
+def read_connection_names(config:dict) -> list[str]:
+    '''
+    返回配置中的只读连接名
+    '''
+    return [name for name in config['connections'] if name.startswith(READ_CONNECTION_PREFIX)]
+
+async def read_pragmas(names:list[str], connection_name:str = 'default') -> dict[str, Any]:
+    '''
+    读取连接上实际生效的PRAGMA值
+    '''
+    connection = Tortoise.get_connection(connection_name)
+    effective = {}
+    for name in names:
+        rows = await connection.execute_query_dict(f'PRAGMA {name}')
+        effective[name] = next(iter(rows[0].values())) if rows else None
+    return effective
+
+def _normalize(name:str, value:Any) -> str:
+    if name == 'synchronous' and isinstance(value, int):
+        return _SYNCHRONOUS.get(value, str(value))
+    if name == 'temp_store' and isinstance(value, int):
+        return _TEMP_STORE.get(value, str(value))
+    return str(value).upper()
+
+async def check_pragmas(pragmas:dict[str, Any], connection_name:str = 'default') -> dict[str, Any]:
+    '''
+    启动自检：记录实际生效的PRAGMA，与配置不一致时告警（如:memory:库不支持WAL，mmap_size受编译上限约束）
+    '''
+    effective = await read_pragmas(list(pragmas), connection_name)
+    logger.info('SQLite PRAGMA [%s]: %s', connection_name, ' '.join(f'{k}={v}' for k, v in effective.items()))
+    for name, expected in pragmas.items():
+        if _normalize(name, effective[name]) != _normalize(name, expected):
+            logger.warning('SQLite PRAGMA %s 期望 %s，实际生效 %s', name, expected, effective[name])
+    return effective
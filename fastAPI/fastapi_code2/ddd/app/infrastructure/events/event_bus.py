@@ -0,0 +1,124 @@
+'''
+进程内异步事件总线
+'''
+import asyncio
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from app.domain.shared.events import DomainEvent, EventPublisher
+
+logger = logging.getLogger(__name__)
+
+Subscriber = Callable[[list[DomainEvent]], Awaitable[None]]
+
+
+@dataclass
+class EventBusStats:
+    '''
+    事件总线统计
+    '''
+    published: int = 0
+    dropped: int = 0
+    delivered: int = 0
+    retried: int = 0
+    failed: int = 0
+
+
+class AsyncEventBus(EventPublisher):
+    '''
+    有界队列 + 工作协程池的事件总线
+
+    publish只把事件放入队列就返回，HTTP响应不包含副作用的耗时；队列满时丢弃并计数，
+    而不是拖慢请求。工作协程每次最多取batch_size个事件，按类型分组后整批交给订阅者，
+    订阅者失败时按指数退避重试max_retries次。
+    '''
+    def __init__(
+            self,
+            workers:int = 2,
+            queue_size:int = 10000,
+            batch_size:int = 100,
+            max_retries:int = 3,
+            retry_backoff:float = 0.1):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.stats = EventBusStats()
+        self._queue: asyncio.Queue[DomainEvent] = asyncio.Queue(maxsize=queue_size)
+        self._subscribers: dict[type, list[Subscriber]] = defaultdict(list)
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def queue_depth(self) -> int:
+        '''待处理事件数'''
+        return self._queue.qsize()
+
+    def subscribe(self, event_type:type, subscriber:Subscriber) -> None:
+        '''订阅某类事件（含子类）'''
+        self._subscribers[event_type].append(subscriber)
+
+    def publish(self, events:list[DomainEvent]) -> None:
+        '''投递事件'''
+        for event in events:
+            try:
+                self._queue.put_nowait(event)
+                self.stats.published += 1
+            except asyncio.QueueFull:
+                self.stats.dropped += 1
+                logger.warning('事件队列已满，丢弃事件 %s', type(event).__name__)
+
+    async def start(self) -> None:
+        '''启动工作协程'''
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self, timeout:float = 10.0) -> None:
+        '''等待队列中的事件处理完（最多timeout秒）后停止工作协程'''
+        if self._tasks:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning('停止事件总线时仍有 %d 个事件未处理', self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._dispatch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _dispatch(self, batch:list[DomainEvent]) -> None:
+        grouped: dict[Subscriber, list[DomainEvent]] = defaultdict(list)
+        for event in batch:
+            for event_type, subscribers in self._subscribers.items():
+                if isinstance(event, event_type):
+                    for subscriber in subscribers:
+                        grouped[subscriber].append(event)
+        for subscriber, events in grouped.items():
+            await self._deliver(subscriber, events)
+
+    async def _deliver(self, subscriber:Subscriber, events:list[DomainEvent]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                await subscriber(events)
+                self.stats.delivered += len(events)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                if attempt == self.max_retries:
+                    self.stats.failed += len(events)
+                    logger.exception('订阅者 %s 处理 %d 个事件失败', getattr(subscriber, '__name__', subscriber), len(events))
+                    return
+                self.stats.retried += 1
+                await asyncio.sleep(self.retry_backoff * 2 ** attempt)
@@ -0,0 +1,16 @@
+'''
+事件订阅者
+'''
+import logging
+
+from app.domain.shared.events import DomainEvent
+
+logger = logging.getLogger('audit')
+
+
+async def audit_log_subscriber(events:list[DomainEvent]) -> None:
+    '''
+    把事件写入审计日志
+    '''
+    for event in events:
+        logger.info('%s %s', type(event).__name__, event)
@@ -0,0 +1,148 @@
+import base64
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from tortoise.expressions import F, Q
+from tortoise.transactions import in_transaction
+
+from app.domain.order.repository import OrderRepository, OrderPage
+from app.domain.order.entity import Order
+from app.domain.shared.vo import OrderID, UserID
+from app.infrastructure.database.mappers import OrderMapper
+from app.infrastructure.database.orm_models import OrderORM, OrderSummaryORM
+from app.infrastructure.database.routing import DatabaseRouter
+
+
+def encode_cursor(created_at:datetime, order_id:int) -> str:
+    '''
+    将分页位置编码为不透明游标
+    '''
+    raw = f'{created_at.isoformat()}|{order_id}'.encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor:str) -> tuple[datetime, int]:
+    '''
+    解析游标，格式错误时抛出ValueError
+    '''
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        created_at, order_id = raw.split('|')
+        return datetime.fromisoformat(created_at), int(order_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError('无效的分页游标') from e
+
+
+class OrderRepositoryImpl(OrderRepository):
+    '''
+    基于ORM 的订单仓储实现
+
+    传入router时分页和计数查询走只读连接，写操作和事务内的查询始终走写连接
+    '''
+    def __init__(self, router:Optional[DatabaseRouter] = None):
+        self.router = router
+
+    def _read_db(self):
+        return self.router.for_read() if self.router else None
+
+    def _transaction(self):
+        # 配置了多个连接时必须显式指定事务所在的写连接
+        return in_transaction(self.router.write_connection if self.router else None)
+
+    async def save(self, order:Order) -> Order:
+        '''保存订单，订单写入与计数、版本戳更新在同一事务内完成'''
+        order_orm = OrderMapper.to_orm(order)
+        if order.id:
+            async with self._transaction():
+                await order_orm.save(update_fields=['order_number', 'total_amount', 'status', 'updated_at'], force_update=True)
+                await self._adjust_counter(order.user_id.value, 0)
+            return OrderMapper.to_entity(order_orm)
+        async with self._transaction():
+            await order_orm.save()
+            await self._adjust_counter(order.user_id.value, 1)
+        return OrderMapper.to_entity(order_orm)
+
+    async def delete(self, order_id:OrderID) -> bool:
+        '''删除订单，同时扣减计数'''
+        async with self._transaction():
+            user_id = await OrderORM.filter(id=order_id.value).first().values_list('user_id', flat=True)
+            if user_id is None:
+                return False
+            await OrderORM.filter(id=order_id.value).delete()
+            await self._adjust_counter(user_id, -1)
+        return True
+
+    @staticmethod
+    async def _adjust_counter(user_id:int, delta:int) -> None:
+        # 计数变化delta，版本戳加1（修改订单时delta为0）
+        updated = await OrderSummaryORM.filter(user_id=user_id).update(
+            order_count=F('order_count') + delta,
+            version=F('version') + 1
+        )
+        if not updated:
+            await OrderSummaryORM.create(user_id=user_id, order_count=max(delta, 0), version=1)
+
+    async def find_page_by_user(self, user_id:UserID, limit:int, cursor:Optional[str] = None) -> OrderPage:
+        '''
+        按(created_at, id)倒序的游标分页
+
+        created_at <= ? 让SQLite在(user_id, created_at, id)索引上直接定位，
+        再用 (created_at < ? OR id < ?) 过滤与游标同一时刻的少量行，不会像OFFSET那样扫描前面所有页
+        '''
+        queryset = OrderORM.filter(user_id=user_id.value).using_db(self._read_db())
+        if cursor:
+            created_at, last_id = decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(created_at__lte=created_at),
+                Q(created_at__lt=created_at) | Q(id__lt=last_id)
+            )
+        # 多取一行用于判断是否还有下一页
+        orm_models = await queryset.order_by('-created_at', '-id').limit(limit + 1)
+        next_cursor = None
+        if len(orm_models) > limit:
+            orm_models = orm_models[:limit]
+            last = orm_models[-1]
+            next_cursor = encode_cursor(last.created_at, last.id)
+        return OrderPage(
+            orders=[OrderMapper.to_entity(orm_model) for orm_model in orm_models],
+            next_cursor=next_cursor
+        )
+
+    async def iter_by_user(self, user_id:UserID, batch_size:int = 500) -> AsyncIterator[list[Order]]:
+        '''
+        复用游标分页逐批读取；每批都是独立的短查询，不会长时间占用读事务阻碍WAL检查点
+        '''
+        cursor = None
+        while True:
+            page = await self.find_page_by_user(user_id, batch_size, cursor)
+            if page.orders:
+                yield page.orders
+            if not page.next_cursor:
+                return
+            cursor = page.next_cursor
+
+    async def count_by_user(self, user_id:UserID) -> int:
+        '''读取用户订单计数（主键查询）'''
+        count = await OrderSummaryORM.filter(user_id=user_id.value).using_db(self._read_db()).first().values_list('order_count', flat=True)
+        return count or 0
+
+    async def version_by_user(self, user_id:UserID) -> int:
+        '''读取用户订单版本戳（主键查询），没有汇总行时为0'''
+        version = await OrderSummaryORM.filter(user_id=user_id.value).using_db(self._read_db()).first().values_list('version', flat=True)
+        return version or 0
+
+    async def rebuild_counters(self) -> int:
+        '''
+        用一条 INSERT ... SELECT GROUP BY 全量重建计数
+
+        用于修复批量导入等绕过仓储写入的订单造成的偏差。
+        重建后的版本戳统一取原最大值加1，保证不会与任何用户已发出的版本戳重复
+        '''
+        async with self._transaction() as connection:
+            rows = await connection.execute_query_dict('SELECT COALESCE(MAX(version), 0) + 1 AS version FROM order_summaries')
+            version = int(rows[0]['version'])
+            await OrderSummaryORM.all().delete()
+            await connection.execute_query(
+                'INSERT INTO order_summaries (user_id, order_count, version, updated_at) '
+                f'SELECT user_id, COUNT(*), {version}, CURRENT_TIMESTAMP FROM orders GROUP BY user_id'
+            )
+            return await OrderSummaryORM.all().count()
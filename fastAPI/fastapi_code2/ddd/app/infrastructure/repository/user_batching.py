@@ -0,0 +1,102 @@
+'''
+组提交的用户仓储
+'''
+from typing import AsyncIterator, Optional
+
+from app.domain.user.repository import DuplicateUsernameError, UserCredentials, UserRepository
+from app.domain.user.entity import User
+from app.domain.shared.vo import UserID
+from app.infrastructure.database.group_commit import GroupCommitQueue
+
+class BatchingUserRepository(UserRepository):
+    '''
+    把并发的新用户save合并成批，在一个事务内提交（一次fsync）
+
+    每个调用方拿到自己那一行的结果；用户名冲突只影响冲突的那一行。
+    更新已有用户及其他操作直接交给底层仓储。
+    '''
+    def __init__(self, inner:UserRepository, max_batch:int = 100, max_delay:float = 0.005):
+        self.inner = inner
+        self.queue: GroupCommitQueue[User, User] = GroupCommitQueue(self._flush, max_batch, max_delay)
+
+    @property
+    def stats(self):
+        '''批大小与延迟统计'''
+        return self.queue.stats
+
+    async def _flush(self, users:list[User]) -> list:
+        results: list = [None] * len(users)
+        # 同一批内重复的用户名，先到者成功
+        first_index: dict[str, int] = {}
+        unique = []
+        for i, user in enumerate(users):
+            if user.username in first_index:
+                results[i] = DuplicateUsernameError(user.username)
+            else:
+                first_index[user.username] = i
+                unique.append(user)
+        try:
+            for user, saved_user in zip(unique, await self.inner.save_many(unique)):
+                results[first_index[user.username]] = saved_user
+        except DuplicateUsernameError:
+            # 与库中已有数据冲突时整批已回滚，逐行重试以得到每一行各自的结果
+            for user in unique:
+                try:
+                    results[first_index[user.username]] = await self.inner.save(user)
+                except Exception as e:
+                    results[first_index[user.username]] = e
+        return results
+
+    async def start(self) -> None:
+        '''启动组提交队列'''
+        await self.queue.start()
+
+    async def close(self) -> None:
+        '''提交剩余的写请求'''
+        await self.queue.close()
+
+    async def save(self, user:User) -> User:
+        '''保存用户，新用户进入组提交队列'''
+        if user.id:
+            return await self.inner.save(user)
+        return await self.queue.submit(user)
+
+    async def find_by_id(self, user_id:UserID) -> Optional[User]:
+        '''通过ID查找用户'''
+        return await self.inner.find_by_id(user_id)
+
+    async def find_by_username(self, username:str) -> Optional[User]:
+        '''通过用户名查找用户'''
+        return await self.inner.find_by_username(username)
+
+    async def find_credentials(self, username:str) -> Optional[UserCredentials]:
+        '''通过用户名查询登录凭据'''
+        return await self.inner.find_credentials(username)
+
+    async def exists_by_username(self, username:str) -> bool:
+        '''检查用户名是否存在'''
+        return await self.inner.exists_by_username(username)
+
+    async def delete(self, user_id:UserID) -> bool:
+        '''删除用户'''
+        return await self.inner.delete(user_id)
+
+    async def find_all(self) -> list[User]:
+        '''查找所有用户'''
+        return await self.inner.find_all()
+
+    def iter_all(self, batch_size:int = 500) -> AsyncIterator[User]:
+        '''分批流式读取全部用户'''
+        return self.inner.iter_all(batch_size)
+
+    async def save_many(self, users:list[User]) -> list[User]:
+        '''批量保存用户（调用方已自行成批，不再排队）'''
+        return await self.inner.save_many(users)
+
+    async def find_by_ids(self, user_ids:list[UserID]) -> list[User]:
+        '''批量通过ID查找用户'''
+        return await self.inner.find_by_ids(user_ids)
+
+    async def delete_many(self, user_ids:list[UserID]) -> int:
+        '''批量删除用户'''
+        return await self.inner.delete_many(user_ids)
@@ -0,0 +1,83 @@
+'''
+带用户名布隆过滤器的用户仓储
+'''
+from typing import AsyncIterable, AsyncIterator, Optional
+
+from app.domain.user.repository import UserCredentials, UserRepository
+from app.domain.user.entity import User
+from app.domain.shared.vo import UserID
+from app.infrastructure.cache.bloom_filter import BloomFilter
+
+class BloomFilterUserRepository(UserRepository):
+    '''
+    用布隆过滤器预判用户名是否已被占用
+
+    只有exists_by_username会被短路：过滤器给出"一定不存在"时不再查库。
+    过滤器只记录本进程内的写入，其他进程新注册的用户名可能漏判，
+    因此最终仍以数据库唯一约束为准（save时冲突会抛出DuplicateUsernameError）；
+    find_by_username等读操作不经过滤器，避免漏判导致的登录失败。
+    '''
+    def __init__(self, inner:UserRepository, bloom:BloomFilter):
+        self.inner = inner
+        self.bloom = bloom
+        self.skipped_lookups = 0
+
+    async def warm_up(self, usernames:AsyncIterable[str]) -> int:
+        '''用已有用户名填充过滤器，返回加入的数量'''
+        count = 0
+        async for username in usernames:
+            self.bloom.add(username)
+            count += 1
+        return count
+
+    async def save(self, user:User) -> User:
+        '''保存用户'''
+        saved_user = await self.inner.save(user)
+        self.bloom.add(saved_user.username)
+        return saved_user
+
+    async def find_by_id(self, user_id:UserID) -> Optional[User]:
+        '''通过ID查找用户'''
+        return await self.inner.find_by_id(user_id)
+
+    async def find_by_username(self, username:str) -> Optional[User]:
+        '''通过用户名查找用户'''
+        return await self.inner.find_by_username(username)
+
+    async def find_credentials(self, username:str) -> Optional[UserCredentials]:
+        '''通过用户名查询登录凭据'''
+        return await self.inner.find_credentials(username)
+
+    async def exists_by_username(self, username:str) -> bool:
+        '''检查用户名是否存在，过滤器判定不存在时跳过查库'''
+        if not self.bloom.might_contain(username):
+            self.skipped_lookups += 1
+            return False
+        return await self.inner.exists_by_username(username)
+
+    async def delete(self, user_id:UserID) -> bool:
+        '''删除用户（布隆过滤器不支持删除，保留旧用户名只会多一次查库）'''
+        return await self.inner.delete(user_id)
+
+    async def find_all(self) -> list[User]:
+        '''查找所有用户'''
+        return await self.inner.find_all()
+
+    def iter_all(self, batch_size:int = 500) -> AsyncIterator[User]:
+        '''分批流式读取全部用户'''
+        return self.inner.iter_all(batch_size)
+
+    async def save_many(self, users:list[User]) -> list[User]:
+        '''批量保存用户'''
+        saved_users = await self.inner.save_many(users)
+        for user in saved_users:
+            self.bloom.add(user.username)
+        return saved_users
+
+    async def find_by_ids(self, user_ids:list[UserID]) -> list[User]:
+        '''批量通过ID查找用户'''
+        return await self.inner.find_by_ids(user_ids)
+
+    async def delete_many(self, user_ids:list[UserID]) -> int:
+        '''批量删除用户'''
+        return await self.inner.delete_many(user_ids)
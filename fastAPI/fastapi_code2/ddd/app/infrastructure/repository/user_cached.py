@@ -0,0 +1,219 @@
+'''
+带读穿透缓存的用户仓储
+'''
+import copy
+from typing import AsyncIterator, Optional
+
+from app.domain.user.repository import UserCredentials, UserRepository
+from app.domain.user.entity import User
+from app.domain.shared.vo import UserID
+from app.infrastructure.cache.lru_cache import TTLLRUCache, CacheStats
+
+class CachedUserRepository(UserRepository):
+    '''
+    包装任意UserRepository的读穿透缓存
+
+    按用户名和UserID两种键缓存查询结果，不存在的结果（None）只缓存negative_ttl秒；
+    save/delete时使相关条目失效。返回的实体均为副本，调用方修改不会污染缓存。
+    未命中时查询底层仓储期间若同一个键被失效（并发的save/delete），查询结果可能已经过时，不再写入缓存：
+    每个正在加载的键记录一个代数，失效时加一，写入前比较。
+    另外维护ID到已缓存用户名的映射（随用户名条目写入、淘汰和失效同步增删），
+    按ID失效时直接找到对应的用户名条目，不需要扫描缓存。
+    '''
+    def __init__(self, inner:UserRepository, max_size:int = 10000, ttl:float = 60.0, negative_ttl:float = 1.0):
+        if negative_ttl < 0:
+            raise ValueError('不存在结果的缓存时间不能小于0')
+        self.inner = inner
+        self.cache = TTLLRUCache(max_size=max_size, ttl=ttl, on_evict=self._forget)
+        self.negative_ttl = negative_ttl
+        # 用户ID -> 缓存中该用户的用户名条目
+        self._usernames: dict[int, str] = {}
+        # 正在加载的键 -> [加载中的调用数, 代数]，没有加载时不保留条目
+        self._loading: dict[tuple, list[int]] = {}
+
+    @property
+    def stats(self) -> CacheStats:
+        '''缓存命中/未命中/淘汰统计'''
+        return self.cache.stats
+
+    @staticmethod
+    def _username_key(username:str) -> tuple:
+        return ('username', username)
+
+    @staticmethod
+    def _id_key(user_id:UserID) -> tuple:
+        return ('id', user_id.value)
+
+    def _begin_load(self, key:tuple) -> int:
+        entry = self._loading.setdefault(key, [0, 0])
+        entry[0] += 1
+        return entry[1]
+
+    def _end_load(self, key:tuple, generation:int) -> bool:
+        '''结束加载，返回加载期间该键是否未被失效'''
+        entry = self._loading[key]
+        entry[0] -= 1
+        if entry[0] == 0:
+            del self._loading[key]
+        return entry[1] == generation
+
+    def _forget(self, key:tuple, value:Optional[User]) -> None:
+        '''用户名条目被移除时删除对应的ID映射'''
+        if key[0] == 'username' and value and value.id and self._usernames.get(value.id.value) == key[1]:
+            del self._usernames[value.id.value]
+
+    def _drop(self, key:tuple) -> Optional[User]:
+        entry = self._loading.get(key)
+        if entry:
+            entry[1] += 1
+        value = self.cache.pop(key)
+        self._forget(key, value)
+        return value
+
+    def _put(self, user:User) -> None:
+        key = self._username_key(user.username)
+        # 覆盖旧条目前先清理它的ID映射
+        self._forget(key, self.cache.pop(key))
+        self.cache.set(key, user)
+        if user.id:
+            self._usernames[user.id.value] = user.username
+            self.cache.set(self._id_key(user.id), user)
+
+    def _put_missing(self, key:tuple) -> None:
+        if self.negative_ttl > 0:
+            self._forget(key, self.cache.pop(key))
+            self.cache.set(key, None, ttl=self.negative_ttl)
+
+    def _invalidate(self, user_id:Optional[UserID] = None, username:Optional[str] = None) -> None:
+        if user_id:
+            self._drop(self._id_key(user_id))
+            cached_username = self._usernames.get(user_id.value)
+            if cached_username is not None:
+                self._drop(self._username_key(cached_username))
+        if username:
+            self._drop(self._username_key(username))
+
+    async def save(self, user:User) -> User:
+        '''保存用户'''
+        saved_user = await self.inner.save(user)
+        self._invalidate(user.id, user.username)
+        self._invalidate(saved_user.id, saved_user.username)
+        return saved_user
+
+    async def find_by_id(self, user_id:UserID) -> Optional[User]:
+        '''通过ID查找用户'''
+        key = self._id_key(user_id)
+        cached = self.cache.get(key)
+        if not TTLLRUCache.is_missing(cached):
+            return copy.copy(cached)
+        generation = self._begin_load(key)
+        try:
+            user = await self.inner.find_by_id(user_id)
+        finally:
+            fresh = self._end_load(key, generation)
+        if fresh:
+            if user:
+                self._put(user)
+            else:
+                self._put_missing(key)
+        return copy.copy(user)
+
+    async def find_by_username(self, username:str) -> Optional[User]:
+        '''通过用户名查找用户'''
+        key = self._username_key(username)
+        cached = self.cache.get(key)
+        if not TTLLRUCache.is_missing(cached):
+            return copy.copy(cached)
+        generation = self._begin_load(key)
+        try:
+            user = await self.inner.find_by_username(username)
+        finally:
+            fresh = self._end_load(key, generation)
+        if fresh:
+            if user:
+                self._put(user)
+            else:
+                self._put_missing(key)
+        return copy.copy(user)
+
+    async def find_credentials(self, username:str) -> Optional[UserCredentials]:
+        '''通过用户名查询登录凭据'''
+        key = self._username_key(username)
+        cached = self.cache.get(key)
+        if not TTLLRUCache.is_missing(cached):
+            return UserCredentials(cached.id.value, cached.password) if cached else None
+        generation = self._begin_load(key)
+        try:
+            credentials = await self.inner.find_credentials(username)
+        finally:
+            fresh = self._end_load(key, generation)
+        if fresh:
+            if credentials:
+                # ID、用户名、密码哈希就是完整的用户实体，可以直接放入缓存
+                self._put(User(id=UserID(credentials.user_id), username=username, password=credentials.password))
+            else:
+                self._put_missing(key)
+        return credentials
+
+    async def exists_by_username(self, username:str) -> bool:
+        '''检查用户名是否存在'''
+        # 未命中时顺便加载登录凭据，同样只有一次查询，随后的登录可以直接命中缓存
+        return await self.find_credentials(username) is not None
+
+    async def delete(self, user_id:UserID) -> bool:
+        '''删除用户'''
+        deleted = await self.inner.delete(user_id)
+        self._invalidate(user_id)
+        return deleted
+
+    async def find_all(self) -> list[User]:
+        '''查找所有用户'''
+        return await self.inner.find_all()
+
+    def iter_all(self, batch_size:int = 500) -> AsyncIterator[User]:
+        '''分批流式读取全部用户'''
+        return self.inner.iter_all(batch_size)
+
+    async def save_many(self, users:list[User]) -> list[User]:
+        '''批量保存用户'''
+        saved_users = await self.inner.save_many(users)
+        for user in users:
+            self._invalidate(user.id, user.username)
+        for user in saved_users:
+            self._invalidate(user.id, user.username)
+        return saved_users
+
+    async def find_by_ids(self, user_ids:list[UserID]) -> list[User]:
+        '''批量通过ID查找用户，只对未命中的ID访问底层仓储'''
+        found = {}
+        missing = []
+        for user_id in user_ids:
+            cached = self.cache.get(self._id_key(user_id))
+            if TTLLRUCache.is_missing(cached):
+                missing.append(user_id)
+            elif cached:
+                found[user_id.value] = cached
+        if missing:
+            generations = {user_id.value: self._begin_load(self._id_key(user_id)) for user_id in missing}
+            try:
+                loaded = await self.inner.find_by_ids(missing)
+            finally:
+                fresh = {
+                    value for value, generation in generations.items()
+                    if self._end_load(('id', value), generation)
+                }
+            for user in loaded:
+                if user.id.value in fresh:
+                    self._put(user)
+                found[user.id.value] = user
+            for value in fresh:
+                if value not in found:
+                    self._put_missing(('id', value))
+        return [copy.copy(found[user_id.value]) for user_id in user_ids if user_id.value in found]
+
+    async def delete_many(self, user_ids:list[UserID]) -> int:
+        '''批量删除用户'''
+        count = await self.inner.delete_many(user_ids)
+        for user_id in user_ids:
+            self._invalidate(user_id)
+        return count
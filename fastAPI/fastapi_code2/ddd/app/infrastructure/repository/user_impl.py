@@ -1,37 +1,75 @@
-from typing import Optional
+from typing import AsyncIterator, Optional
 
-from app.domain.user.repository import UserRepository
+from tortoise.exceptions import IntegrityError
+from tortoise.transactions import in_transaction
+
+from app.domain.user.repository import DuplicateUsernameError, UserCredentials, UserRepository
 from app.domain.user.entity import User
 from app.domain.shared.vo import UserID
 from app.infrastructure.database.mappers import UserMapper
 from app.infrastructure.database.orm_models import UserORM
+from app.infrastructure.database.routing import DatabaseRouter
+
+# SQLite单条语句的绑定变量数有上限，批量操作按此大小分块
+BATCH_SIZE = 500
+# 构建User实体所需的列，顺序与UserMapper.from_row一致
+USER_COLUMNS = ('id', 'username', 'password')
+
+def _chunks(items:list, size:int = BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
 
 class UserRepositoryImpl(UserRepository):
     '''
     基于ORM 的用户仓储实现
+
+    传入router时查询走只读连接，写操作和事务内的查询始终走写连接
     '''
+    def __init__(self, router:Optional[DatabaseRouter] = None):
+        self.router = router
+
+    def _read_db(self):
+        return self.router.for_read() if self.router else None
+
+    def _transaction(self):
+        # 配置了多个连接时必须显式指定事务所在的写连接
+        return in_transaction(self.router.write_connection if self.router else None)
+
     async def save(self, user:User) -> User:
         user_orm = UserMapper.to_orm(user)
-        await user_orm.save()
+        try:
+            if user.id:
+                # 已有ID的实体执行UPDATE，只更新实体持有的字段
+                await user_orm.save(update_fields=['username', 'password', 'updated_at'], force_update=True)
+            else:
+                await user_orm.save()
+        except IntegrityError:
+            # 用户名唯一约束是最终判断依据
+            raise DuplicateUsernameError(user.username)
         return UserMapper.to_entity(user_orm)
     
     async def find_by_id(self, user_id:UserID) -> Optional[User]:
         '''通过ID查找用户'''
-        orm_model = await UserORM.get_or_none(id=user_id.value)
+        orm_model = await UserORM.get_or_none(id=user_id.value, using_db=self._read_db())
         if orm_model:
             return UserMapper.to_entity(orm_model)
         return None
     
     async def find_by_username(self, username:str) -> Optional[User]:
         '''通过用户名查找用户'''
-        orm_model = await UserORM.get_or_none(username=username)
+        orm_model = await UserORM.get_or_none(username=username, using_db=self._read_db())
         if orm_model:
             return UserMapper.to_entity(orm_model)
         return None
     
+    async def find_credentials(self, username:str) -> Optional[UserCredentials]:
+        '''通过用户名只查询ID和密码哈希，不创建ORM对象'''
+        rows = await UserORM.filter(username=username).using_db(self._read_db()).limit(1).values_list('id', 'password')
+        return UserCredentials(*rows[0]) if rows else None
+
     async def exists_by_username(self, username:str) -> bool:
         '''检查用户名是否存在'''
-        return await UserORM.get_or_none(username=username).exists()
+        return await UserORM.exists(username=username, using_db=self._read_db())
 
     async def delete(self, user_id:UserID) -> bool:
         '''删除用户'''
@@ -39,6 +77,67 @@ class UserRepositoryImpl(UserRepository):
         return count > 0
     
     async def find_all(self) -> list[User]:
-        '''查找所有用户'''
-        orm_models = await UserORM.all()
-        return [UserMapper.to_entity(orm_model) for orm_model in orm_models]
+        '''查找所有用户（只取实体需要的列，不创建ORM对象）'''
+        rows = await UserORM.all().using_db(self._read_db()).values_list(*USER_COLUMNS)
+        return UserMapper.from_rows(rows)
+
+    async def iter_all(self, batch_size:int = BATCH_SIZE) -> AsyncIterator[User]:
+        '''按ID分批流式读取全部用户'''
+        last_id = 0
+        while True:
+            rows = await UserORM.filter(id__gt=last_id).using_db(self._read_db()).order_by('id').limit(batch_size).values_list(*USER_COLUMNS)
+            if not rows:
+                return
+            for user in UserMapper.from_rows(rows):
+                yield user
+            last_id = rows[-1][0]
+
+    async def save_many(self, users:list[User]) -> list[User]:
+        '''批量保存用户（单个事务）'''
+        if not users:
+            return []
+        new_users = [user for user in users if not user.id]
+        old_users = [user for user in users if user.id]
+        saved = {}
+        try:
+            async with self._transaction():
+                if new_users:
+                    await UserORM.bulk_create(UserMapper.to_orms(new_users), batch_size=BATCH_SIZE)
+                if old_users:
+                    await UserORM.bulk_update(UserMapper.to_orms(old_users), fields=['username', 'password'], batch_size=BATCH_SIZE)
+                # SQLite下bulk_create不会回填自增ID，按唯一的用户名回查
+                for chunk in _chunks([user.username for user in users]):
+                    for orm_model in await UserORM.filter(username__in=chunk):
+                        saved[orm_model.username] = UserMapper.to_entity(orm_model)
+        except IntegrityError:
+            raise DuplicateUsernameError()
+        return [saved[user.username] for user in users]
+
+    async def find_by_ids(self, user_ids:list[UserID]) -> list[User]:
+        '''批量通过ID查找用户'''
+        found = {}
+        for chunk in _chunks([user_id.value for user_id in user_ids]):
+            for orm_model in await UserORM.filter(id__in=chunk).using_db(self._read_db()):
+                found[orm_model.id] = UserMapper.to_entity(orm_model)
+        return [found[user_id.value] for user_id in user_ids if user_id.value in found]
+
+    async def delete_many(self, user_ids:list[UserID]) -> int:
+        '''批量删除用户'''
+        if not user_ids:
+            return 0
+        count = 0
+        async with self._transaction():
+            for chunk in _chunks([user_id.value for user_id in user_ids]):
+                count += await UserORM.filter(id__in=chunk).delete()
+        return count
+
+    async def iter_usernames(self, batch_size:int = BATCH_SIZE) -> AsyncIterator[str]:
+        '''按ID分批流式读取全部用户名，不一次性加载整张表'''
+        last_id = 0
+        while True:
+            rows = await UserORM.filter(id__gt=last_id).using_db(self._read_db()).order_by('id').limit(batch_size).values_list('id', 'username')
+            if not rows:
+                return
+            for _, username in rows:
+                yield username
+            last_id = rows[-1][0]
@@ -0,0 +1,117 @@
+'''
+基于hashlib KDF的密码哈希实现
+'''
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from app.domain.user.password import PasswordHasher
+
+SCRYPT = 'scrypt'
+PBKDF2 = 'pbkdf2_sha256'
+
+
+def _b64encode(data:bytes) -> str:
+    return base64.b64encode(data).decode('ascii')
+
+def _b64decode(data:str) -> bytes:
+    return base64.b64decode(data.encode('ascii'))
+
+
+class PasswordHasherImpl(PasswordHasher):
+    '''
+    在有界线程池中执行KDF的密码哈希服务
+
+    hashlib的scrypt/pbkdf2_hmac在计算期间会释放GIL，线程池即可利用多核且不阻塞事件循环。
+    哈希格式：
+        scrypt$<n>$<r>$<p>$<salt>$<hash>
+        pbkdf2_sha256$<iterations>$<salt>$<hash>
+    不符合以上格式的存储值视为旧版明文密码，校验通过后needs_rehash返回True，由调用方升级。
+    '''
+    def __init__(
+            self,
+            algorithm:str = SCRYPT,
+            scrypt_n:int = 2 ** 14,
+            scrypt_r:int = 8,
+            scrypt_p:int = 1,
+            pbkdf2_iterations:int = 600_000,
+            max_workers:int = 4,
+            salt_size:int = 16,
+            executor:Optional[ThreadPoolExecutor] = None):
+        if algorithm not in (SCRYPT, PBKDF2):
+            raise ValueError(f'不支持的密码哈希算法: {algorithm}')
+        self.algorithm = algorithm
+        self.scrypt_n = scrypt_n
+        self.scrypt_r = scrypt_r
+        self.scrypt_p = scrypt_p
+        self.pbkdf2_iterations = pbkdf2_iterations
+        self.salt_size = salt_size
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hasher')
+
+    async def hash(self, password:str) -> str:
+        '''计算密码哈希'''
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.hash_sync, password)
+
+    async def verify(self, password:str, hashed:str) -> bool:
+        '''校验密码'''
+        if self._is_legacy(hashed):
+            return hmac.compare_digest(password.encode('utf-8'), hashed.encode('utf-8'))
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.verify_sync, password, hashed)
+
+    def needs_rehash(self, hashed:str) -> bool:
+        '''算法或成本参数与当前配置不一致时需要升级'''
+        if self._is_legacy(hashed):
+            return True
+        parts = hashed.split('$')
+        if parts[0] != self.algorithm:
+            return True
+        if parts[0] == SCRYPT:
+            return (int(parts[1]), int(parts[2]), int(parts[3])) != (self.scrypt_n, self.scrypt_r, self.scrypt_p)
+        return int(parts[1]) != self.pbkdf2_iterations
+
+    def hash_sync(self, password:str) -> str:
+        '''同步计算哈希（在工作线程中执行）'''
+        salt = os.urandom(self.salt_size)
+        if self.algorithm == SCRYPT:
+            n, r, p = self.scrypt_n, self.scrypt_r, self.scrypt_p
+            digest = self._scrypt(password, salt, n, r, p)
+            return f'{SCRYPT}${n}${r}${p}${_b64encode(salt)}${_b64encode(digest)}'
+        iterations = self.pbkdf2_iterations
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+        return f'{PBKDF2}${iterations}${_b64encode(salt)}${_b64encode(digest)}'
+
+    def verify_sync(self, password:str, hashed:str) -> bool:
+        '''同步校验哈希（在工作线程中执行）'''
+        parts = hashed.split('$')
+        if parts[0] == SCRYPT:
+            n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            salt, expected = _b64decode(parts[4]), _b64decode(parts[5])
+            digest = self._scrypt(password, salt, n, r, p, len(expected))
+        else:
+            iterations = int(parts[1])
+            salt, expected = _b64decode(parts[2]), _b64decode(parts[3])
+            digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations, len(expected))
+        return hmac.compare_digest(digest, expected)
+
+    def close(self) -> None:
+        '''关闭线程池'''
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _scrypt(password:str, salt:bytes, n:int, r:int, p:int, dklen:int = 64) -> bytes:
+        # scrypt约需 128*n*r*p 字节内存，留出一倍余量
+        return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r * p, dklen=dklen)
+
+    @staticmethod
+    def _is_legacy(hashed:str) -> bool:
+        parts = hashed.split('$')
+        return not (
+            (parts[0] == SCRYPT and len(parts) == 6)
+            or (parts[0] == PBKDF2 and len(parts) == 4)
+        )
@@ -0,0 +1,175 @@
+'''
+基于HMAC-SHA256的无状态会话令牌
+'''
+import base64
+import binascii
+import hashlib
+import hmac
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from app.domain.user.session import SessionClaims, SessionTokenService
+from app.infrastructure.cache.lru_cache import CacheStats, TTLLRUCache
+
+logger = logging.getLogger(__name__)
+
+VERSION = 'v1'
+# 配置文件中的占位密钥，以及签名密钥的最小长度（字节）
+PLACEHOLDER_SECRET_KEYS = frozenset({'your-secret-key'})
+MIN_SECRET_KEY_BYTES = 32
+
+
+def _b64encode(data:bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def _b64decode(data:str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+@dataclass
+class SessionTokenStats:
+    '''
+    令牌签发和校验统计
+    '''
+    issued: int = 0
+    verified: int = 0
+    invalid: int = 0
+    expired: int = 0
+    revoked: int = 0
+
+
+class RevocationList:
+    '''
+    已吊销令牌的deny-list：令牌ID -> 过期时间
+
+    只需要保存到令牌自然过期为止；条目数翻倍时清理一次已过期的条目，均摊O(1)
+    '''
+    def __init__(self, clock:Callable[[], float] = time.time):
+        self._clock = clock
+        self._entries: dict[str, int] = {}
+        self._prune_at = 1024
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, token_id:str) -> bool:
+        return token_id in self._entries
+
+    def add(self, token_id:str, expires_at:int) -> None:
+        '''
+        吊销令牌，已过期的令牌无需记录
+        '''
+        now = self._clock()
+        if expires_at <= now:
+            return
+        self._entries[token_id] = expires_at
+        if len(self._entries) >= self._prune_at:
+            self._entries = {key: value for key, value in self._entries.items() if value > now}
+            self._prune_at = max(1024, len(self._entries) * 2)
+
+
+class HmacSessionTokenService(SessionTokenService):
+    '''
+    HMAC签名的会话令牌服务
+
+    令牌格式：v1.<payload>.<signature>，均为无填充的base64url
+        payload   = "<user_id>:<issued_at>:<expires_at>:<token_id>:<username>"
+        signature = HMAC-SHA256(key, "v1.<payload>")
+    签名密钥由secret_key派生，与其他用途的密钥隔离。
+    校验通过的令牌放入有界LRU，命中时只检查过期时间和deny-list。
+    deny-list保存在进程内，多worker部署时吊销只在处理该请求的进程内生效（退出登录是尽力而为的），
+    令牌在其他worker上仍然有效直到过期，需要严格吊销时应缩短ttl。
+    占位密钥或短于MIN_SECRET_KEY_BYTES的密钥任何人都能猜到并伪造令牌，除非allow_weak_key（调试模式）否则拒绝创建。
+    '''
+    def __init__(
+            self,
+            secret_key:str,
+            ttl:int = 3600,
+            cache_size:int = 10000,
+            cache_ttl:float = 300.0,
+            clock:Callable[[], float] = time.time,
+            allow_weak_key:bool = False):
+        if not secret_key:
+            raise ValueError('会话令牌密钥不能为空')
+        if secret_key in PLACEHOLDER_SECRET_KEYS or len(secret_key.encode('utf-8')) < MIN_SECRET_KEY_BYTES:
+            if not allow_weak_key:
+                raise ValueError(
+                    f'会话令牌密钥不安全：请把SECRET_KEY设置为至少{MIN_SECRET_KEY_BYTES}字节的随机值（不能使用默认占位值）'
+                )
+            logger.warning('会话令牌使用了占位或过短的密钥，仅限调试环境')
+        if ttl <= 0:
+            raise ValueError('会话令牌有效期必须大于0')
+        self._key = hmac.new(secret_key.encode('utf-8'), b'session-token', hashlib.sha256).digest()
+        self._ttl = ttl
+        self._clock = clock
+        self._verified = TTLLRUCache(max_size=cache_size, ttl=cache_ttl)
+        self.revoked = RevocationList(clock)
+        self.stats = SessionTokenStats()
+
+    @property
+    def ttl(self) -> int:
+        '''令牌有效期（秒）'''
+        return self._ttl
+
+    @property
+    def cache_stats(self) -> CacheStats:
+        '''已校验令牌缓存的统计'''
+        return self._verified.stats
+
+    def issue(self, user_id:int, username:str) -> str:
+        '''签发令牌'''
+        issued_at = int(self._clock())
+        token_id = _b64encode(os.urandom(9))
+        payload = _b64encode(f'{user_id}:{issued_at}:{issued_at + self._ttl}:{token_id}:{username}'.encode('utf-8'))
+        signed = f'{VERSION}.{payload}'
+        self.stats.issued += 1
+        return f'{signed}.{self._sign(signed)}'
+
+    def verify(self, token:str) -> Optional[SessionClaims]:
+        '''校验令牌，签名错误、已过期或已吊销时返回None'''
+        claims = self._verified.get(token, None)
+        if claims is None:
+            claims = self._decode(token)
+            if claims is None:
+                self.stats.invalid += 1
+                return None
+            self._verified.set(token, claims)
+        if claims.expires_at <= self._clock():
+            self._verified.pop(token)
+            self.stats.expired += 1
+            return None
+        if claims.token_id in self.revoked:
+            self.stats.revoked += 1
+            return None
+        self.stats.verified += 1
+        return claims
+
+    def revoke(self, claims:SessionClaims) -> None:
+        '''吊销令牌，在其过期前拒绝后续校验'''
+        self.revoked.add(claims.token_id, claims.expires_at)
+
+    def _sign(self, signed:str) -> str:
+        return _b64encode(hmac.new(self._key, signed.encode('ascii'), hashlib.sha256).digest())
+
+    def _decode(self, token:str) -> Optional[SessionClaims]:
+        signed, _, signature = token.rpartition('.')
+        version, _, payload = signed.partition('.')
+        if version != VERSION or not payload:
+            return None
+        try:
+            if not hmac.compare_digest(self._sign(signed), signature):
+                return None
+            user_id, issued_at, expires_at, token_id, username = _b64decode(payload).decode('utf-8').split(':', 4)
+            return SessionClaims(
+                user_id=int(user_id),
+                username=username,
+                issued_at=int(issued_at),
+                expires_at=int(expires_at),
+                token_id=token_id
+            )
+        except (ValueError, TypeError, UnicodeError, binascii.Error):
+            # 签名正确但载荷无法解析只可能是密钥泄露或格式变更，一律按无效处理
+            return None
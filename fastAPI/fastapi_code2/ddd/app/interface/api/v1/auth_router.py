@@ -2,11 +2,14 @@
 认证和用户路由
 '''
 
+from typing import Optional
+
 from pydantic import BaseModel
-from fastapi import APIRouter, Depends,status, HTTPException
+from fastapi import APIRouter, Depends,status, HTTPException, Response
 
 from app.application.common.exception import DomainException
-from app.interface.dependency import get_register_user_handler,get_login_user_handler
+from app.domain.user.session import SessionClaims, SessionTokenService
+from app.interface.dependency import get_register_user_handler,get_login_user_handler,get_current_session,get_session_token_service
 from app.application.user.commands.register_user import RegisterUserCommand, RegisterUserHandler
 from app.application.user.commands.login_user import LoginUserCommand,LoginUserHandler
 
@@ -39,6 +42,17 @@ class LoginResponse(BaseModel):
     user_id:int
     username:str
     message:str
+    access_token:Optional[str] = None
+    token_type:str = 'bearer'
+    expires_in:Optional[int] = None
+
+class SessionResponse(BaseModel):
+    '''
+    当前会话响应
+    '''
+    user_id:int
+    username:str
+    expires_at:int
 
 
 @router.post('/register',response_model=RegisterResponse,status_code=status.HTTP_201_CREATED)
@@ -82,9 +96,31 @@ async def login_user(
         return LoginResponse(
             user_id=result.user_id,
             username=result.username,
-            message="用户登录成功"
+            message="用户登录成功",
+            access_token=result.access_token,
+            expires_in=result.expires_in
         )
     except DomainException as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
     except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='服务器内部错误')
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='服务器内部错误')
+
+@router.get('/me',response_model=SessionResponse)
+async def current_session(claims:SessionClaims = Depends(get_current_session)):
+    '''
+    当前登录用户，信息全部来自令牌，不查询数据库
+    '''
+    return SessionResponse(user_id=claims.user_id, username=claims.username, expires_at=claims.expires_at)
+
+@router.post('/logout',status_code=status.HTTP_204_NO_CONTENT)
+async def logout_user(
+    claims:SessionClaims = Depends(get_current_session),
+    token_service:SessionTokenService = Depends(get_session_token_service)
+    ):
+    '''
+    退出登录，吊销当前令牌
+
+    尽力而为：吊销记录只保存在处理本请求的进程内，多worker部署时该令牌在其他worker上仍然有效，直到自然过期
+    '''
+    token_service.revoke(claims)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
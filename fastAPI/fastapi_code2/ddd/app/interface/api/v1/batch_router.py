@@ -0,0 +1,71 @@
+'''
+批量请求路由
+'''
+import json
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+from fastapi import APIRouter, status, HTTPException, Request, Response
+
+from app.interface.batch import DEPTH_SCOPE_KEY, BatchDispatcher, SubRequest, render_batch
+
+router = APIRouter(prefix="/batch", tags=["批量请求"])
+
+class SubRequestModel(BaseModel):
+    '''
+    子请求
+    '''
+    id:Optional[str] = None
+    method:str = 'GET'
+    url:str
+    headers:Dict[str,str] = {}
+    body:Optional[Any] = None
+
+class BatchRequest(BaseModel):
+    '''
+    批量请求
+    '''
+    requests:List[SubRequestModel]
+
+class SubResponseModel(BaseModel):
+    '''
+    子请求响应
+    '''
+    id:Optional[str] = None
+    status:int
+    headers:Dict[str,str]
+    body:Optional[Any] = None
+
+class BatchResponse(BaseModel):
+    '''
+    批量响应，responses与requests一一对应
+    '''
+    responses:List[SubResponseModel]
+
+
+@router.post('',response_model=BatchResponse)
+async def batch(request:Request, payload:BatchRequest):
+    '''
+    在一次往返中并发执行多个子请求
+
+    子请求继承本请求的请求头（如Authorization），彼此之间没有执行顺序
+    '''
+    if request.scope.get(DEPTH_SCOPE_KEY):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail='不能嵌套批量请求')
+    dispatcher:BatchDispatcher = request.app.state.batch_dispatcher
+    requests = [
+        SubRequest(
+            method=item.method,
+            url=item.url,
+            headers=item.headers,
+            body=None if item.body is None else json.dumps(item.body, ensure_ascii=False).encode('utf-8'),
+            id=item.id
+        )
+        for item in payload.requests
+    ]
+    try:
+        dispatcher.validate(requests)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    responses = await dispatcher.dispatch(request.scope, requests)
+    return Response(content=render_batch(responses), media_type='application/json')
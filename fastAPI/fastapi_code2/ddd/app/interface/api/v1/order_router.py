@@ -2,14 +2,18 @@
 订单路由
 '''
 
-from typing import List, Optional
+import hashlib
+from typing import List, Optional, TypedDict
 
-from pydantic import BaseModel
-from fastapi import APIRouter, Depends,status, HTTPException,Query
+from pydantic import BaseModel, TypeAdapter
+from fastapi import APIRouter, Depends,status, HTTPException,Query,Request,Response
+from fastapi.responses import StreamingResponse
 
-from app.interface.dependency import get_get_orders_handler
+from config.settngs import settings
+from app.interface.dependency import get_get_orders_handler,get_export_orders_handler
 from app.application.common.exception import DomainException
-from app.application.user.queries.get_orders import GetOrdersQuery,GetOrdersHandler
+from app.application.user.queries.get_orders import GetOrdersQuery,GetOrdersHandler,OrderDTO
+from app.application.user.queries.export_orders import ExportOrdersQuery,ExportOrdersHandler
 
 router = APIRouter(prefix="/orders", tags=["订单"])
 
@@ -31,41 +35,112 @@ class GetOrdersResponse(BaseModel):
     orders:List[OrderResponse]
     total:int
     limit:int
-    offset:int
+    next_cursor:Optional[str] = None
+
+class GetOrdersPayload(TypedDict):
+    '''
+    获取订单响应的序列化结构，字段与GetOrdersResponse一致
+    '''
+    orders:List[OrderDTO]
+    total:int
+    limit:int
+    next_cursor:Optional[str]
+
+# OrderDTO由处理器构造，数据可信：不再逐条复制成OrderResponse并二次校验，
+# 直接由缓存的TypeAdapter把dataclass序列化成JSON字节。response_model仅用于生成文档
+_payload_adapter = TypeAdapter(GetOrdersPayload)
+
+_order_adapter = TypeAdapter(OrderDTO)
+
+def render_orders(payload:GetOrdersPayload) -> bytes:
+    '''
+    序列化订单列表响应
+    '''
+    return _payload_adapter.dump_json(payload)
+
+def render_ndjson(orders:List[OrderDTO]) -> bytes:
+    '''
+    把一批订单序列化为NDJSON（每行一个JSON对象）
+    '''
+    dump_json = _order_adapter.dump_json
+    return b''.join(dump_json(order) + b'\n' for order in orders)
+
+def order_list_etag(user_id:int, version:int, limit:int, cursor:Optional[str]) -> str:
+    '''
+    订单列表的弱ETag：版本戳加查询参数摘要（含应用版本，响应格式变化后旧ETag自动失效）
+    '''
+    params = f'{settings.app_version}:{user_id}:{limit}:{cursor or ""}'.encode('utf-8')
+    return f'W/"{version}-{hashlib.blake2b(params, digest_size=8).hexdigest()}"'
+
+def etag_matches(if_none_match:Optional[str], etag:str) -> bool:
+    '''
+    按弱比较判断If-None-Match是否命中
+    '''
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(tag.strip().removeprefix('W/') == opaque for tag in if_none_match.split(','))
 
 @router.get('/',response_model=GetOrdersResponse)
 async def get_orders(
+    request:Request,
     user_id:int = Query(...,description="用户ID"),
     limit:Optional[int] =Query(10,ge=1,le=100,description="每页数量"),
-    offset:Optional[int] =Query(0,ge=0,description="偏移量"),
+    cursor:Optional[str] =Query(None,description="分页游标，取上一页返回的next_cursor"),
     handler:GetOrdersHandler = Depends(get_get_orders_handler)
 ):
     """
     获取用户订单
+
+    响应带弱ETag；If-None-Match命中时只读取版本戳就返回304，不执行分页查询和序列化。
+    版本戳在查询之前读取，查询期间发生的写入只会让下一次请求重新返回完整结果
     """
     try:
+        headers = None
+        if settings.order_etag_enabled:
+            etag = order_list_etag(user_id, await handler.version(user_id), limit or 10, cursor)
+            headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+            if etag_matches(request.headers.get('if-none-match'), etag):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
         query = GetOrdersQuery(
             user_id=user_id,
             limit=limit,
-            offset=offset
+            cursor=cursor
         )
         rs = await handler.handle(query)
-        return GetOrdersResponse(
-            orders= [
-                OrderResponse(
-                    id=order.id,
-                    order_number=order.order_number,
-                    total_amount=order.total_amount,
-                    status=order.status,
-                    created_at=order.created_at,
-                    updated_at=order.updated_at
-                ) 
-                for order in rs.orders],
-            total=rs.total,
-            limit=limit or 10,
-            offset=offset or 0
-        )
+        content = render_orders({
+            'orders': rs.orders,
+            'total': rs.total,
+            'limit': limit or 10,
+            'next_cursor': rs.next_cursor
+        })
+        return Response(content=content, media_type='application/json', headers=headers)
     except DomainException as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
     except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='服务器内部错误')
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail='服务器内部错误')
+
+@router.get('/export')
+async def export_orders(
+    user_id:int = Query(...,description="用户ID"),
+    handler:ExportOrdersHandler = Depends(get_export_orders_handler)
+):
+    """
+    以NDJSON流式导出用户的全部订单
+
+    每次从数据库读取一批、序列化后发送一个分块；发送会等待客户端消费（背压），
+    客户端读得慢时不会继续查库，内存占用与订单总数无关
+    """
+    query = ExportOrdersQuery(user_id=user_id, batch_size=settings.order_export_batch_size)
+    try:
+        handler.validate(query)
+    except DomainException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+
+    async def body():
+        async for orders in handler.handle(query):
+            yield render_ndjson(orders)
+
+    return StreamingResponse(body(), media_type='application/x-ndjson')
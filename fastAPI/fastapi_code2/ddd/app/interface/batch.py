@@ -0,0 +1,203 @@
+'''
+批量请求：在进程内把多个子请求并发分发给ASGI应用
+'''
+import asyncio
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+from urllib.parse import unquote
+
+from starlette.exceptions import HTTPException
+from starlette.types import ASGIApp, Message, Scope
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE'})
+
+# 子请求继承批量请求的其他请求头（如Authorization），这些与请求体、连接相关的以及条件请求头除外
+# （父请求的If-None-Match等与子请求无关，继承后会把子请求变成没有响应体的304）
+_SKIPPED_HEADERS = frozenset({
+    b'content-length', b'content-type', b'transfer-encoding', b'connection', b'expect', b'accept-encoding',
+    b'if-none-match', b'if-modified-since', b'if-match', b'if-unmodified-since', b'if-range'
+})
+# 子请求scope中的嵌套深度标记，批量路由拒绝带有该标记的请求
+DEPTH_SCOPE_KEY = 'batch.depth'
+
+_SLASHES = re.compile(r'/{2,}')
+# 子请求与父请求共用的scope字段，包括ExceptionMiddleware登记的异常处理器（路由据此把HTTPException转成响应）
+_INHERITED_SCOPE_KEYS = (
+    'type', 'asgi', 'http_version', 'scheme', 'server', 'client', 'root_path', 'app', 'starlette.exception_handlers'
+)
+
+_INTERNAL_ERROR = json.dumps({'detail': '服务器内部错误'}, ensure_ascii=False).encode('utf-8')
+
+
+@dataclass
+class SubRequest:
+    '''
+    批量请求中的一个子请求，url为站内路径（可带查询参数）
+    '''
+    method: str
+    url: str
+    headers: dict[str, str] = field(default_factory=dict)
+    body: Optional[bytes] = None
+    id: Optional[str] = None
+    # 由validate填入：解码并规范化后的路径和查询串，分发时按它路由
+    path: str = field(default='', init=False)
+    query: str = field(default='', init=False)
+
+
+@dataclass
+class SubResponse:
+    '''
+    子请求的响应
+    '''
+    id: Optional[str]
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+    @property
+    def content_type(self) -> str:
+        '''响应的Content-Type'''
+        for name, value in self.headers:
+            if name == b'content-type':
+                return value.decode('latin-1')
+        return ''
+
+
+class BatchDispatcher:
+    '''
+    批量请求分发器
+
+    子请求直接调用app（通常是路由本身或只包一层准入控制），不再经过指标、计时等外层中间件，
+    只按max_concurrency并发执行；单个子请求出错只影响它自己的响应。
+    子请求之间没有先后顺序，不能依赖同一批中其他子请求的结果。
+    '''
+    def __init__(self, app:ASGIApp, batch_path:str, max_requests:int = 20, max_concurrency:int = 8):
+        if max_requests <= 0 or max_concurrency <= 0:
+            raise ValueError('批量请求数和并发数必须大于0')
+        self.app = app
+        self.batch_path = batch_path
+        self.max_requests = max_requests
+        self.max_concurrency = max_concurrency
+
+    def validate(self, requests:list[SubRequest]) -> None:
+        '''
+        校验子请求并规范化路径，不合法时抛出ValueError
+        '''
+        if not requests:
+            raise ValueError('子请求不能为空')
+        if len(requests) > self.max_requests:
+            raise ValueError(f'子请求数不能超过{self.max_requests}')
+        for request in requests:
+            if request.method.upper() not in ALLOWED_METHODS:
+                raise ValueError(f'不支持的请求方法: {request.method}')
+            raw_path, _, query = request.url.partition('?')
+            if not raw_path.startswith('/') or raw_path.startswith('//'):
+                raise ValueError(f'子请求地址必须是站内路径: {request.url}')
+            # 与路由使用同一个解码后的路径做检查，避免 /api/v1/%62atch 之类的写法绕过
+            path = _SLASHES.sub('/', unquote(raw_path))
+            if path.rstrip('/') == self.batch_path.rstrip('/'):
+                raise ValueError('不能嵌套批量请求')
+            request.path, request.query = path, query
+            try:
+                for name, value in request.headers.items():
+                    name.encode('latin-1'), value.encode('latin-1')
+            except UnicodeEncodeError:
+                raise ValueError('子请求头只能包含latin-1字符')
+
+    async def dispatch(self, parent:Scope, requests:list[SubRequest]) -> list[SubResponse]:
+        '''
+        并发执行子请求（须先经过validate），按原顺序返回响应
+        '''
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(request:SubRequest) -> SubResponse:
+            async with semaphore:
+                return await self._call(parent, request)
+
+        return list(await asyncio.gather(*(run(request) for request in requests)))
+
+    async def _call(self, parent:Scope, request:SubRequest) -> SubResponse:
+        body = request.body or b''
+        headers = [(name, value) for name, value in parent.get('headers', []) if name not in _SKIPPED_HEADERS]
+        headers += [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in request.headers.items()]
+        if request.body is not None:
+            if not any(name == b'content-type' for name, _ in headers):
+                headers.append((b'content-type', b'application/json'))
+            headers.append((b'content-length', str(len(body)).encode('latin-1')))
+        scope = {key: parent[key] for key in _INHERITED_SCOPE_KEYS if key in parent}
+        scope.update({
+            'method': request.method.upper(),
+            'path': request.path,
+            'raw_path': request.path.encode('utf-8'),
+            'query_string': request.query.encode('utf-8'),
+            'headers': headers,
+            'state': {},
+            DEPTH_SCOPE_KEY: parent.get(DEPTH_SCOPE_KEY, 0) + 1,
+        })
+
+        status = 0
+        response_headers: list[tuple[bytes, bytes]] = []
+        chunks: list[bytes] = []
+        request_sent = False
+        finished = asyncio.Event()
+
+        async def receive() -> Message:
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            # 流式响应会监听断开事件，响应结束前不能返回disconnect
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message:Message) -> None:
+            nonlocal status, response_headers
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                response_headers = [(name.lower(), value) for name, value in message.get('headers', [])]
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+                if not message.get('more_body', False):
+                    finished.set()
+
+        try:
+            await self.app(scope, receive, send)
+        except HTTPException as e:
+            # 路由匹配失败（404/405）时在路由之外抛出，没有经过ExceptionMiddleware
+            body = json.dumps({'detail': e.detail}, ensure_ascii=False).encode('utf-8')
+            return SubResponse(request.id, e.status_code, [(b'content-type', b'application/json')], body)
+        except Exception:
+            logger.exception('批量子请求执行失败 %s %s', request.method, request.url)
+            return SubResponse(request.id, 500, [(b'content-type', b'application/json')], _INTERNAL_ERROR)
+        finally:
+            finished.set()
+        return SubResponse(request.id, status, response_headers, b''.join(chunks))
+
+
+def render_batch(responses:list[SubResponse]) -> bytes:
+    '''
+    序列化批量响应
+
+    JSON响应体原样嵌入，不再解析后重新序列化；其他类型的响应体作为字符串返回，空响应体为null
+    '''
+    parts = []
+    for response in responses:
+        if not response.body:
+            body = b'null'
+        elif response.content_type.startswith('application/json'):
+            body = response.body
+        else:
+            body = json.dumps(response.body.decode('utf-8', 'replace'), ensure_ascii=False).encode('utf-8')
+        headers = {
+            name.decode('latin-1'): value.decode('latin-1')
+            for name, value in response.headers
+            if name != b'content-length'
+        }
+        head = json.dumps({'id': response.id, 'status': response.status, 'headers': headers}, ensure_ascii=False)
+        parts.append(head[:-1].encode('utf-8') + b',"body":' + body + b'}')
+    return b'{"responses":[' + b','.join(parts) + b']}'
@@ -0,0 +1,145 @@
+'''
+应用级依赖容器
+'''
+import inspect
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Awaitable, Callable, Hashable, Optional, Union
+
+
+class Scope(str, Enum):
+    '''
+    依赖生命周期
+    '''
+    SINGLETON = 'singleton'   # 整个应用共享一个实例
+    REQUEST = 'request'       # 同一请求内共享一个实例
+    TRANSIENT = 'transient'   # 每次解析都创建新实例
+
+
+Hook = Callable[[Any], Union[Awaitable[None], None]]
+
+
+@dataclass
+class Provider:
+    '''
+    依赖提供者
+    '''
+    factory: Callable[['Container'], Any]
+    scope: Scope
+    on_startup: Optional[Hook] = None
+    on_shutdown: Optional[Hook] = None
+
+
+@dataclass
+class ResolveStats:
+    '''
+    依赖解析耗时统计
+    '''
+    count: int = 0
+    seconds: float = 0.0
+
+
+class Container:
+    '''
+    支持singleton/request/transient三种生命周期的依赖容器
+
+    在lifespan中调用startup预先创建所有单例并执行启动钩子，
+    请求期间解析单例只是一次字典查询；shutdown按创建的逆序执行关闭钩子。
+    '''
+    def __init__(self):
+        self.stats = ResolveStats()
+        self._providers: dict[Hashable, Provider] = {}
+        self._singletons: dict[Hashable, Any] = {}
+        self._created: list[Hashable] = []
+        self._request_cache: Optional[dict] = None
+
+    def register(
+            self,
+            key:Hashable,
+            factory:Callable[['Container'], Any],
+            scope:Scope = Scope.SINGLETON,
+            on_startup:Optional[Hook] = None,
+            on_shutdown:Optional[Hook] = None) -> None:
+        '''
+        注册依赖，factory接收容器本身用于解析下级依赖
+        '''
+        if key in self._singletons:
+            raise RuntimeError(f'依赖已实例化，不能重复注册: {key}')
+        self._providers[key] = Provider(factory, scope, on_startup, on_shutdown)
+
+    def resolve(self, key:Hashable, request_cache:Optional[dict] = None) -> Any:
+        '''
+        解析依赖；request作用域的实例缓存在request_cache中
+        '''
+        instance = self._singletons.get(key)
+        if instance is not None:
+            return instance
+        provider = self._providers.get(key)
+        if provider is None:
+            raise KeyError(f'未注册的依赖: {key}')
+        if provider.scope is Scope.SINGLETON:
+            instance = self._singletons[key] = provider.factory(self)
+            self._created.append(key)
+            return instance
+        if provider.scope is Scope.REQUEST:
+            cache = request_cache if request_cache is not None else self._request_cache
+            if cache is None:
+                raise RuntimeError(f'request作用域的依赖只能在请求内解析: {key}')
+            if key not in cache:
+                previous, self._request_cache = self._request_cache, cache
+                try:
+                    cache[key] = provider.factory(self)
+                finally:
+                    self._request_cache = previous
+            return cache[key]
+        previous = self._request_cache
+        if request_cache is not None:
+            self._request_cache = request_cache
+        try:
+            return provider.factory(self)
+        finally:
+            self._request_cache = previous
+
+    def resolve_timed(self, key:Hashable, request_cache:Optional[dict] = None) -> tuple[Any, float]:
+        '''
+        解析依赖并返回耗时（秒），同时累计到stats
+        '''
+        start = time.perf_counter()
+        instance = self.resolve(key, request_cache)
+        elapsed = time.perf_counter() - start
+        self.stats.count += 1
+        self.stats.seconds += elapsed
+        return instance, elapsed
+
+    def instances(self) -> list[Any]:
+        '''
+        已创建的单例，按创建顺序
+        '''
+        return [self._singletons[key] for key in self._created]
+
+    async def startup(self) -> None:
+        '''
+        创建全部单例并执行启动钩子
+        '''
+        for key, provider in list(self._providers.items()):
+            if provider.scope is Scope.SINGLETON:
+                instance = self.resolve(key)
+                if provider.on_startup:
+                    await _maybe_await(provider.on_startup(instance))
+
+    async def shutdown(self) -> None:
+        '''
+        按创建的逆序执行关闭钩子并释放单例
+        '''
+        for key in reversed(self._created):
+            provider = self._providers[key]
+            if provider.on_shutdown:
+                await _maybe_await(provider.on_shutdown(self._singletons[key]))
+        self._singletons.clear()
+        self._created.clear()
+
+
+async def _maybe_await(result:Any) -> None:
+    if inspect.isawaitable(result):
+        await result
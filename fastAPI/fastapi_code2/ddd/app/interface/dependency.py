@@ -1,37 +1,222 @@
 '''
 依赖注入模块
 '''
-from fastapi import Depends
+from typing import Any, Hashable, Optional
 
+from fastapi import HTTPException, Request, status
+
+from config.settngs import settings
+from app.interface.container import Container, Scope
 from app.domain.user.repository import UserRepository
+from app.domain.user.password import PasswordHasher
+from app.domain.user.session import SessionClaims, SessionTokenService
+from app.domain.order.repository import OrderRepository
+from app.domain.shared.events import EventPublisher
+from app.domain.user.events import UserRegistered, UserLoggedIn
 from app.infrastructure.repository.user_impl import UserRepositoryImpl
+from app.infrastructure.repository.user_cached import CachedUserRepository
+from app.infrastructure.repository.user_bloom import BloomFilterUserRepository
+from app.infrastructure.repository.user_batching import BatchingUserRepository
+from app.infrastructure.cache.bloom_filter import BloomFilter
+from app.infrastructure.database.routing import DatabaseRouter
+from app.infrastructure.repository.order_impl import OrderRepositoryImpl
+from app.infrastructure.security.password_hasher import PasswordHasherImpl
+from app.infrastructure.security.session_token import HmacSessionTokenService
+from app.infrastructure.events.event_bus import AsyncEventBus
+from app.infrastructure.events.subscribers import audit_log_subscriber
 from app.application.user.commands.register_user import RegisterUserHandler
 from app.application.user.commands.login_user import LoginUserHandler
 from app.application.user.queries.get_orders import GetOrdersHandler
+from app.application.user.queries.export_orders import ExportOrdersHandler
+
+
+def _build_user_repository(container:Container) -> UserRepository:
+    '''
+    按配置组装用户仓储：ORM实现 -> 组提交 -> 读穿透缓存 -> 用户名布隆过滤器
+    '''
+    repository: UserRepository = container.resolve(UserRepositoryImpl)
+    if settings.user_write_batch_enabled:
+        repository = container.resolve(BatchingUserRepository)
+    if settings.user_cache_enabled:
+        repository = CachedUserRepository(
+            repository,
+            max_size=settings.user_cache_max_size,
+            ttl=settings.user_cache_ttl,
+            negative_ttl=settings.user_cache_negative_ttl
+        )
+    if settings.username_bloom_enabled:
+        repository = BloomFilterUserRepository(
+            repository,
+            BloomFilter(settings.username_bloom_capacity, settings.username_bloom_fp_rate)
+        )
+    return repository
+
+def _build_event_bus(container:Container) -> AsyncEventBus:
+    '''
+    创建事件总线并注册订阅者
+    '''
+    bus = AsyncEventBus(
+        workers=settings.event_bus_workers,
+        queue_size=settings.event_bus_queue_size,
+        batch_size=settings.event_bus_batch_size,
+        max_retries=settings.event_bus_max_retries,
+        retry_backoff=settings.event_bus_retry_backoff_ms / 1000
+    )
+    bus.subscribe(UserRegistered, audit_log_subscriber)
+    bus.subscribe(UserLoggedIn, audit_log_subscriber)
+    return bus
 
+def build_container(read_connections:Optional[list[str]] = None) -> Container:
+    '''
+    创建应用依赖容器，处理器和仓储均无请求状态，注册为单例
+
+    read_connections为只读连接名，仓储的查询会轮询使用这些连接
+    '''
+    container = Container()
+
+    async def warm_up_username_filter(repository:UserRepository) -> None:
+        # 启动时流式读取users表填充用户名布隆过滤器
+        if isinstance(repository, BloomFilterUserRepository):
+            await repository.warm_up(container.resolve(UserRepositoryImpl).iter_usernames())
+
+    container.register(DatabaseRouter, lambda c: DatabaseRouter(read_connections=read_connections))
+    container.register(UserRepositoryImpl, lambda c: UserRepositoryImpl(c.resolve(DatabaseRouter)))
+    container.register(
+        BatchingUserRepository,
+        lambda c: BatchingUserRepository(
+            c.resolve(UserRepositoryImpl),
+            max_batch=settings.user_write_batch_max_size,
+            max_delay=settings.user_write_batch_max_delay_ms / 1000
+        ),
+        # 在启动阶段创建写队列的工作协程，不继承任何请求的contextvars（查询统计、SQL检查）
+        on_startup=lambda repository: repository.start(),
+        on_shutdown=lambda repository: repository.close()
+    )
+    container.register(UserRepository, _build_user_repository, on_startup=warm_up_username_filter)
+    container.register(OrderRepository, lambda c: OrderRepositoryImpl(c.resolve(DatabaseRouter)))
+    container.register(
+        PasswordHasher,
+        lambda c: PasswordHasherImpl(
+            algorithm=settings.password_hash_algorithm,
+            scrypt_n=settings.password_scrypt_n,
+            scrypt_r=settings.password_scrypt_r,
+            scrypt_p=settings.password_scrypt_p,
+            pbkdf2_iterations=settings.password_pbkdf2_iterations,
+            max_workers=settings.password_hash_workers
+        ),
+        on_shutdown=lambda hasher: hasher.close()
+    )
+    container.register(
+        SessionTokenService,
+        lambda c: HmacSessionTokenService(
+            settings.secret_key,
+            ttl=settings.session_token_ttl,
+            cache_size=settings.session_token_cache_size,
+            cache_ttl=settings.session_token_cache_ttl,
+            allow_weak_key=settings.debug
+        )
+    )
+    # 事件总线在处理器之前创建，关闭时在处理器之后、数据库关闭之前排空队列
+    container.register(
+        EventPublisher,
+        _build_event_bus,
+        on_startup=lambda bus: bus.start(),
+        on_shutdown=lambda bus: bus.stop()
+    )
+    container.register(
+        RegisterUserHandler,
+        lambda c: RegisterUserHandler(c.resolve(UserRepository), c.resolve(PasswordHasher), c.resolve(EventPublisher))
+    )
+    container.register(
+        LoginUserHandler,
+        lambda c: LoginUserHandler(
+            c.resolve(UserRepository),
+            c.resolve(PasswordHasher),
+            c.resolve(EventPublisher),
+            c.resolve(SessionTokenService)
+        )
+    )
+    container.register(GetOrdersHandler, lambda c: GetOrdersHandler(c.resolve(OrderRepository)))
+    container.register(ExportOrdersHandler, lambda c: ExportOrdersHandler(c.resolve(OrderRepository)))
+    return container
+
+def resolve(request:Request, key:Hashable) -> Any:
+    '''
+    从应用容器解析依赖，并把耗时累计到request.state.di_seconds
+    '''
+    state = request.state
+    cache = getattr(state, 'di_cache', None)
+    if cache is None:
+        cache = state.di_cache = {}
+        state.di_seconds = 0.0
+    instance, elapsed = request.app.state.container.resolve_timed(key, cache)
+    state.di_seconds += elapsed
+    return instance
 
-def get_user_repository() -> UserRepository:
+def get_user_repository(request:Request) -> UserRepository:
     '''
     获取用户仓储
     '''
-    return UserRepositoryImpl()
+    return resolve(request, UserRepository)
 
-def get_register_user_handler(
-        user_repository:UserRepository = Depends(get_user_repository)) -> RegisterUserHandler:
+def get_password_hasher(request:Request) -> PasswordHasher:
+    '''
+    获取密码哈希服务
+    '''
+    return resolve(request, PasswordHasher)
+
+def get_order_repository(request:Request) -> OrderRepository:
+    '''
+    获取订单仓储
+    '''
+    return resolve(request, OrderRepository)
+
+def get_session_token_service(request:Request) -> SessionTokenService:
+    '''
+    获取会话令牌服务
+    '''
+    return resolve(request, SessionTokenService)
+
+def get_current_session(request:Request) -> SessionClaims:
+    '''
+    校验Authorization: Bearer令牌，返回会话信息，不查询数据库
+    '''
+    scheme, _, token = request.headers.get('authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='未登录',
+            headers={'WWW-Authenticate': 'Bearer'}
+        )
+    claims = get_session_token_service(request).verify(token.strip())
+    if claims is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='登录已失效',
+            headers={'WWW-Authenticate': 'Bearer error="invalid_token"'}
+        )
+    return claims
+
+def get_register_user_handler(request:Request) -> RegisterUserHandler:
     '''
     获取注册用户处理器
     '''
-    return RegisterUserHandler(user_repository)
+    return resolve(request, RegisterUserHandler)
 
-def get_login_user_handler(
-        user_repository:UserRepository = Depends(get_user_repository)) -> LoginUserHandler:
+def get_login_user_handler(request:Request) -> LoginUserHandler:
     '''
     获取登录用户处理器
     '''
-    return LoginUserHandler(user_repository)
+    return resolve(request, LoginUserHandler)
 
-def get_get_orders_handler() -> GetOrdersHandler:
+def get_get_orders_handler(request:Request) -> GetOrdersHandler:
     '''
     获取订单处理器
     '''
-    return GetOrdersHandler()
\ No newline at end of file
+    return resolve(request, GetOrdersHandler)
+
+def get_export_orders_handler(request:Request) -> ExportOrdersHandler:
+    '''
+    获取订单导出处理器
+    '''
+    return resolve(request, ExportOrdersHandler)
@@ -0,0 +1,244 @@
+'''
+Prometheus文本格式的指标
+
+指标保存在进程内，多worker部署时每个worker各自统计，由Prometheus按实例分别抓取。
+'''
+import bisect
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Optional
+
+from app.infrastructure.database.instrumentation import QueryStats, total_query_stats
+from app.infrastructure.events.event_bus import AsyncEventBus
+from app.infrastructure.repository.user_batching import BatchingUserRepository
+from app.infrastructure.repository.user_bloom import BloomFilterUserRepository
+from app.infrastructure.repository.user_cached import CachedUserRepository
+from app.infrastructure.security.session_token import HmacSessionTokenService
+
+# 延迟分桶上界（秒）
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    '''
+    固定分桶直方图，observe只有一次二分查找和几次加法
+    '''
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds:tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)   # 最后一个桶是+Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value:float) -> None:
+        '''记录一个观测值'''
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        '''Prometheus要求的累计分桶：(le, 小于等于该上界的观测数)'''
+        buckets = []
+        total = 0
+        for bound, count in zip(self.bounds, self.counts):
+            total += count
+            buckets.append((_format_value(bound), total))
+        buckets.append(('+Inf', self.count))
+        return buckets
+
+
+@dataclass
+class MetricFamily:
+    '''
+    一组同名指标；histogram类型的samples值为Histogram
+    '''
+    name: str
+    kind: str       # counter / gauge / histogram
+    help: str
+    samples: list[tuple[dict[str, str], Any]] = field(default_factory=list)
+
+
+Collector = Callable[[], Iterable[MetricFamily]]
+
+
+class MetricsRegistry:
+    '''
+    请求延迟直方图（按方法、路由模板、状态码）和其他组件指标的汇总
+    '''
+    def __init__(self):
+        self.requests: dict[tuple[str, str, str], Histogram] = {}
+        self.db_time: dict[tuple[str, str], Histogram] = {}
+        self.db_queries: dict[tuple[str, str], int] = {}
+        self.collectors: list[Collector] = []
+
+    def observe_request(self, method:str, route:str, status:int, seconds:float, queries:QueryStats) -> None:
+        '''记录一次请求'''
+        key = (method, route, str(status))
+        histogram = self.requests.get(key)
+        if histogram is None:
+            histogram = self.requests[key] = Histogram()
+        histogram.observe(seconds)
+
+        route_key = (method, route)
+        histogram = self.db_time.get(route_key)
+        if histogram is None:
+            histogram = self.db_time[route_key] = Histogram()
+        histogram.observe(queries.seconds)
+        self.db_queries[route_key] = self.db_queries.get(route_key, 0) + queries.queries
+
+    def add_collector(self, collector:Collector) -> None:
+        '''注册在渲染时调用的指标收集函数'''
+        self.collectors.append(collector)
+
+    def collect(self) -> list[MetricFamily]:
+        '''收集全部指标'''
+        families = [
+            MetricFamily(
+                'http_request_duration_seconds', 'histogram', '请求处理耗时',
+                [({'method': m, 'route': r, 'status': s}, h) for (m, r, s), h in self.requests.items()]
+            ),
+            MetricFamily(
+                'http_request_db_duration_seconds', 'histogram', '单个请求内的数据库查询耗时',
+                [({'method': m, 'route': r}, h) for (m, r), h in self.db_time.items()]
+            ),
+            MetricFamily(
+                'http_request_db_queries_total', 'counter', '请求内执行的数据库查询数',
+                [({'method': m, 'route': r}, n) for (m, r), n in self.db_queries.items()]
+            ),
+            MetricFamily('db_queries_total', 'counter', '本进程执行的数据库查询数', [({}, total_query_stats.queries)]),
+            MetricFamily('db_query_seconds_total', 'counter', '本进程数据库查询累计耗时', [({}, total_query_stats.seconds)]),
+        ]
+        for collector in self.collectors:
+            families.extend(collector())
+        return families
+
+    def render(self) -> str:
+        '''渲染为Prometheus文本格式'''
+        lines = []
+        for family in self.collect():
+            lines.append(f'# HELP {family.name} {family.help}')
+            lines.append(f'# TYPE {family.name} {family.kind}')
+            for labels, value in family.samples:
+                if family.kind == 'histogram':
+                    for le, count in value.cumulative():
+                        lines.append(f'{family.name}_bucket{_format_labels({**labels, "le": le})} {count}')
+                    lines.append(f'{family.name}_sum{_format_labels(labels)} {_format_value(value.sum)}')
+                    lines.append(f'{family.name}_count{_format_labels(labels)} {value.count}')
+                else:
+                    lines.append(f'{family.name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels:dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+def _escape(value:str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_value(value:float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def collect_admission(gates:dict[str, Any]) -> list[MetricFamily]:
+    '''
+    准入控制闸门的并发、排队和拒绝数
+    '''
+    in_flight = MetricFamily('admission_in_flight', 'gauge', '正在处理的请求数')
+    queue_depth = MetricFamily('admission_queue_depth', 'gauge', '排队等待的请求数')
+    admitted = MetricFamily('admission_admitted_total', 'counter', '准入的请求数')
+    rejected = MetricFamily('admission_rejected_total', 'counter', '返回503的请求数')
+    for gate in gates.values():
+        labels = {'gate': gate.name}
+        in_flight.samples.append((labels, gate.in_flight))
+        queue_depth.samples.append((labels, gate.queue_depth))
+        admitted.samples.append((labels, gate.stats.admitted))
+        rejected.samples.append(({**labels, 'reason': 'queue_full'}, gate.stats.rejected_queue_full))
+        rejected.samples.append(({**labels, 'reason': 'deadline'}, gate.stats.rejected_deadline))
+        rejected.samples.append(({**labels, 'reason': 'timeout'}, gate.stats.timed_out))
+    return [in_flight, queue_depth, admitted, rejected]
+
+def collect_compression(stats:Optional[Any]) -> list[MetricFamily]:
+    '''
+    响应压缩的次数和压缩前后字节数
+    '''
+    if stats is None:
+        return []
+    return [
+        MetricFamily('http_compressed_responses_total', 'counter', '压缩的响应数',
+                     [({'encoding': e}, n) for e, n in stats.responses.items()]),
+        MetricFamily('http_compression_skipped_total', 'counter', '低于阈值未压缩的响应数',
+                     [({'reason': 'below_threshold'}, stats.skipped_small)]),
+        MetricFamily('http_compression_input_bytes_total', 'counter', '压缩前字节数',
+                     [({'encoding': e}, n) for e, n in stats.bytes_in.items()]),
+        MetricFamily('http_compression_output_bytes_total', 'counter', '压缩后字节数',
+                     [({'encoding': e}, n) for e, n in stats.bytes_out.items()]),
+        MetricFamily('http_compression_saved_bytes_total', 'counter', '压缩节省的字节数',
+                     [({'encoding': e}, n - stats.bytes_out.get(e, 0)) for e, n in stats.bytes_in.items()]),
+    ]
+
+def _unwrap(instance:Any) -> Iterable[Any]:
+    # 仓储装饰器链通过inner逐层包装
+    seen = set()
+    while instance is not None and id(instance) not in seen:
+        seen.add(id(instance))
+        yield instance
+        instance = getattr(instance, 'inner', None)
+
+def collect_container(container:Optional[Any]) -> list[MetricFamily]:
+    '''
+    依赖容器中已创建组件的统计：依赖解析、组提交、用户缓存、布隆过滤器、事件总线、会话令牌
+    '''
+    if container is None:
+        return []
+    families = [
+        MetricFamily('di_resolve_total', 'counter', '请求内依赖解析次数', [({}, container.stats.count)]),
+        MetricFamily('di_resolve_seconds_total', 'counter', '请求内依赖解析累计耗时', [({}, container.stats.seconds)]),
+    ]
+    components = {id(c): c for instance in container.instances() for c in _unwrap(instance)}
+    for component in components.values():
+        if isinstance(component, BatchingUserRepository):
+            stats = component.stats
+            families += [
+                MetricFamily('user_write_batches_total', 'counter', '组提交批次数', [({}, stats.batches)]),
+                MetricFamily('user_write_batch_rows_total', 'counter', '组提交写入行数', [({}, stats.rows)]),
+                MetricFamily('user_write_batch_flush_seconds_total', 'counter', '组提交写库累计耗时', [({}, stats.flush_seconds)]),
+            ]
+        elif isinstance(component, CachedUserRepository):
+            stats = component.stats
+            families.append(MetricFamily('user_cache_requests_total', 'counter', '用户缓存查询数', [
+                ({'result': 'hit'}, stats.hits),
+                ({'result': 'miss'}, stats.misses),
+            ]))
+            families.append(MetricFamily('user_cache_evictions_total', 'counter', '用户缓存淘汰数', [
+                ({'reason': 'lru'}, stats.evictions),
+                ({'reason': 'ttl'}, stats.expirations),
+            ]))
+        elif isinstance(component, BloomFilterUserRepository):
+            families.append(MetricFamily(
+                'username_bloom_skipped_lookups_total', 'counter', '布隆过滤器省去的用户名查询数',
+                [({}, component.skipped_lookups)]
+            ))
+        elif isinstance(component, AsyncEventBus):
+            stats = component.stats
+            families.append(MetricFamily('event_bus_queue_depth', 'gauge', '待处理事件数', [({}, component.queue_depth)]))
+            families.append(MetricFamily('event_bus_events_total', 'counter', '事件数', [
+                ({'outcome': outcome}, getattr(stats, outcome))
+                for outcome in ('published', 'dropped', 'delivered', 'retried', 'failed')
+            ]))
+        elif isinstance(component, HmacSessionTokenService):
+            stats, cache_stats = component.stats, component.cache_stats
+            families.append(MetricFamily('session_tokens_issued_total', 'counter', '签发的会话令牌数', [({}, stats.issued)]))
+            families.append(MetricFamily('session_token_verifications_total', 'counter', '会话令牌校验数', [
+                ({'result': result}, getattr(stats, result))
+                for result in ('verified', 'invalid', 'expired', 'revoked')
+            ]))
+            families.append(MetricFamily('session_token_cache_requests_total', 'counter', '已校验令牌缓存查询数', [
+                ({'result': 'hit'}, cache_stats.hits),
+                ({'result': 'miss'}, cache_stats.misses),
+            ]))
+            families.append(MetricFamily('session_token_revoked', 'gauge', 'deny-list中未过期的吊销记录数', [({}, len(component.revoked))]))
+    return families
@@ -0,0 +1,422 @@
+'''
+ASGI中间件
+'''
+import asyncio
+import functools
+import json
+import logging
+import math
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.infrastructure.database.instrumentation import (
+    QueryInspector, QueryStats, current_query_inspector, current_query_stats
+)
+from app.interface.metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class DependencyTimingMiddleware:
+    '''
+    在响应头Server-Timing中报告本次请求的依赖解析耗时
+
+    dependency.resolve把耗时累计在request.state（即scope['state']）中，
+    依赖总是在响应开始之前解析完毕，因此在http.response.start时读取即可。
+    '''
+    def __init__(self, app:ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope:Scope, receive:Receive, send:Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        state = scope.setdefault('state', {})
+
+        async def send_wrapper(message:Message) -> None:
+            if message['type'] == 'http.response.start' and 'di_seconds' in state:
+                headers = list(message.get('headers', []))
+                headers.append((b'server-timing', f'di;dur={state["di_seconds"] * 1000:.3f}'.encode('latin-1')))
+                message['headers'] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def route_template(scope:Scope) -> str:
+    '''
+    返回匹配到的路由模板（如/api/v1/orders/），未匹配时返回<unmatched>
+
+    较新的FastAPI在scope['route']中放的是子路由器内的原始路由，路径不含include_router的前缀，
+    这里用路由的正则找出请求路径中属于前缀的部分再拼回去；旧版本展开后的路由直接从0开始匹配。
+    '''
+    route = scope.get('route')
+    template = getattr(route, 'path', None)
+    regex = getattr(route, 'path_regex', None)
+    if template is None or regex is None:
+        return '<unmatched>'
+    path = scope['path']
+    start = 0
+    while start != -1:
+        if regex.match(path[start:]):
+            return path[:start] + template
+        start = path.find('/', start + 1)
+    return template
+
+
+class MetricsMiddleware:
+    '''
+    记录每个请求的总耗时和数据库耗时，按方法、路由模板、状态码汇总到直方图
+
+    数据库耗时来自instrumentation中对Tortoise客户端的计时，请求开始时把QueryStats放入contextvar，
+    请求内的查询累计到这个对象上（组提交等在后台任务中执行的写入不计入），同时在Server-Timing中报告db耗时。
+    未匹配路由的请求（包括准入控制直接拒绝的）统一记为<unmatched>，避免路径进入标签造成基数膨胀。
+    '''
+    def __init__(self, app:ASGIApp, registry:MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope:Scope, receive:Receive, send:Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        queries = QueryStats()
+        token = current_query_stats.set(queries)
+        status = 500
+
+        async def send_wrapper(message:Message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                headers = list(message.get('headers', []))
+                headers.append((b'server-timing', f'db;dur={queries.seconds * 1000:.3f}'.encode('latin-1')))
+                message['headers'] = headers
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_query_stats.reset(token)
+            self.registry.observe_request(scope['method'], route_template(scope), status, elapsed, queries)
+
+
+class QueryInspectionMiddleware:
+    '''
+    统计每个请求执行的SQL数和读取的行数，同一形状的SQL执行次数达到threshold时记录可能的N+1查询
+
+    结果写入响应头x-db-queries/x-db-rows（响应开始之后的查询，如流式导出，只计入日志）。
+    只在开启检查时加入中间件栈；未开启时查询计时包装只多一次contextvar读取。
+    '''
+    def __init__(self, app:ASGIApp, threshold:int = 5):
+        self.app = app
+        self.threshold = threshold
+
+    async def __call__(self, scope:Scope, receive:Receive, send:Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        inspector = QueryInspector()
+        token = current_query_inspector.set(inspector)
+
+        async def send_wrapper(message:Message) -> None:
+            if message['type'] == 'http.response.start':
+                headers = list(message.get('headers', []))
+                headers.append((b'x-db-queries', str(inspector.queries).encode('latin-1')))
+                headers.append((b'x-db-rows', str(inspector.rows).encode('latin-1')))
+                message['headers'] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_query_inspector.reset(token)
+            route = f'{scope["method"]} {route_template(scope)}'
+            for shape, count in inspector.repeated(self.threshold):
+                logger.warning('可能的N+1查询：%s 中同一形状的SQL执行了 %d 次：%s', route, count, shape)
+            logger.debug('%s 执行 %d 条SQL，读取 %d 行', route, inspector.queries, inspector.rows)
+
+
+@dataclass
+class GateStats:
+    '''
+    准入控制统计
+    '''
+    admitted: int = 0
+    rejected_queue_full: int = 0
+    rejected_deadline: int = 0
+    timed_out: int = 0
+
+
+class AdmissionGate:
+    '''
+    单个路由组的并发闸门：最多max_concurrency个请求在处理，其余在有界队列中按先来先服务等待
+
+    根据最近的平均处理时长估算排队等待时间，预计等不到deadline的请求直接拒绝，
+    避免请求在队列里耗到超时才失败，也让已准入请求的延迟保持稳定。
+    '''
+    def __init__(self, name:str, max_concurrency:int, max_queue:int, queue_timeout:float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.stats = GateStats()
+        self._waiters: deque[asyncio.Future] = deque()
+        self._service_time = 0.0    # 处理时长的指数移动平均（秒）
+
+    @property
+    def queue_depth(self) -> int:
+        '''当前排队数'''
+        return len(self._waiters)
+
+    def estimated_wait(self, position:int) -> float:
+        '''排在第position位时的预计等待时间'''
+        return (position + 1) * self._service_time / self.max_concurrency
+
+    def record_service_time(self, seconds:float) -> None:
+        self._service_time = seconds if not self._service_time else 0.8 * self._service_time + 0.2 * seconds
+
+    async def acquire(self) -> Optional[float]:
+        '''
+        获取处理名额；成功返回None，被拒绝时返回建议的重试等待秒数
+        '''
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            self.stats.admitted += 1
+            return None
+        if len(self._waiters) >= self.max_queue:
+            self.stats.rejected_queue_full += 1
+            return max(1.0, self.estimated_wait(len(self._waiters)))
+        wait = self.estimated_wait(len(self._waiters))
+        if wait > self.queue_timeout:
+            self.stats.rejected_deadline += 1
+            return max(1.0, wait)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._abandon(future)
+            self.stats.timed_out += 1
+            return max(1.0, self.queue_timeout)
+        except asyncio.CancelledError:
+            self._abandon(future)
+            raise
+        self.stats.admitted += 1
+        return None
+
+    def _abandon(self, future:asyncio.Future) -> None:
+        if future.done() and not future.cancelled():
+            # 名额已经转交过来，放弃时要交还
+            self.release()
+        else:
+            future.cancel()
+            try:
+                self._waiters.remove(future)
+            except ValueError:
+                pass
+
+    def release(self) -> None:
+        '''释放名额，优先直接转交给队首的等待者'''
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+class AdmissionControlMiddleware:
+    '''
+    按路径前缀把请求分到不同的AdmissionGate，超出承载时返回503和Retry-After
+
+    未匹配任何前缀的请求（文档、根路由等）不受限制。
+    '''
+    def __init__(self, app:ASGIApp, gates:dict[str, AdmissionGate]):
+        self.app = app
+        # 前缀长的优先匹配
+        self.gates = sorted(gates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def _match(self, path:str) -> Optional[AdmissionGate]:
+        for prefix, gate in self.gates:
+            if path.startswith(prefix):
+                return gate
+        return None
+
+    async def __call__(self, scope:Scope, receive:Receive, send:Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        gate = self._match(scope['path'])
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+        retry_after = await gate.acquire()
+        if retry_after is not None:
+            await self._reject(send, retry_after)
+            return
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.record_service_time(time.perf_counter() - start)
+            gate.release()
+
+    @staticmethod
+    async def _reject(send:Send, retry_after:float) -> None:
+        body = json.dumps({'detail': '服务繁忙，请稍后重试'}, ensure_ascii=False).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': 503,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode('latin-1')),
+                (b'retry-after', str(math.ceil(retry_after)).encode('latin-1')),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+
+# 各编码对应的zlib wbits：gzip带gzip头，HTTP的deflate是带zlib头的deflate流
+_ENCODING_WBITS = {'gzip': 16 + zlib.MAX_WBITS, 'deflate': zlib.MAX_WBITS}
+
+_COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/x-ndjson', 'application/javascript', 'application/xml'
+)
+
+@functools.lru_cache(maxsize=256)
+def negotiate_encoding(accept_encoding:str) -> Optional[str]:
+    '''
+    按Accept-Encoding的q值选择gzip或deflate（同等时优先gzip），都不接受时返回None
+    '''
+    qualities = {}
+    for item in accept_encoding.lower().split(','):
+        name, _, params = item.partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[name.strip()] = quality
+    best, best_quality = None, 0.0
+    for encoding in _ENCODING_WBITS:
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+@dataclass
+class CompressionStats:
+    '''
+    响应压缩统计，按编码分别累计压缩前后的字节数
+    '''
+    responses: dict[str, int] = field(default_factory=dict)
+    bytes_in: dict[str, int] = field(default_factory=dict)
+    bytes_out: dict[str, int] = field(default_factory=dict)
+    skipped_small: int = 0
+
+    def record(self, encoding:str, bytes_in:int, bytes_out:int) -> None:
+        '''累计一段压缩数据'''
+        self.bytes_in[encoding] = self.bytes_in.get(encoding, 0) + bytes_in
+        self.bytes_out[encoding] = self.bytes_out.get(encoding, 0) + bytes_out
+
+
+class CompressionMiddleware:
+    '''
+    按Accept-Encoding对响应做gzip/deflate压缩
+
+    完整响应体小于minimum_size时不压缩（压缩收益抵不过CPU和头部开销）；
+    流式响应（如NDJSON导出）无法预知大小，一律逐块压缩，每块后做Z_SYNC_FLUSH，客户端能立即解出已发送的数据。
+    已编码、非文本类型、1xx/204/304的响应原样透传；强ETag改为弱ETag，因为压缩后的字节与原表示不同。
+    压缩在事件循环中同步执行，level越高CPU越多，JSON在5以上压缩率提升很小。
+    '''
+    def __init__(self, app:ASGIApp, minimum_size:int = 1024, level:int = 5, stats:Optional[CompressionStats] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+        self.stats = stats or CompressionStats()
+
+    async def __call__(self, scope:Scope, receive:Receive, send:Send) -> None:
+        if scope['type'] != 'http' or scope['method'] == 'HEAD':
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = ''
+        for name, value in scope['headers']:
+            if name == b'accept-encoding':
+                accept_encoding = value.decode('latin-1')
+                break
+        encoding = negotiate_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message:Message) -> None:
+            nonlocal start_message, compressor, passthrough
+            if message['type'] == 'http.response.start':
+                start_message = message
+                return
+            if passthrough or message['type'] != 'http.response.body':
+                await send(message)
+                return
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if compressor is None:
+                headers = MutableHeaders(scope=start_message)
+                if not self._compressible(start_message['status'], headers):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                headers.add_vary_header('Accept-Encoding')
+                if not more_body and len(body) < self.minimum_size:
+                    self.stats.skipped_small += 1
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                compressor = zlib.compressobj(self.level, zlib.DEFLATED, _ENCODING_WBITS[encoding])
+                self.stats.responses[encoding] = self.stats.responses.get(encoding, 0) + 1
+                headers['Content-Encoding'] = encoding
+                etag = headers.get('etag')
+                if etag and not etag.startswith('W/'):
+                    headers['ETag'] = 'W/' + etag
+                if not more_body:
+                    data = compressor.compress(body) + compressor.flush()
+                    headers['Content-Length'] = str(len(data))
+                    self.stats.record(encoding, len(body), len(data))
+                    await send(start_message)
+                    await send({'type': 'http.response.body', 'body': data})
+                    return
+                if 'content-length' in headers:
+                    del headers['Content-Length']
+                await send(start_message)
+            data = compressor.compress(body) + compressor.flush(zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH)
+            self.stats.record(encoding, len(body), len(data))
+            await send({'type': 'http.response.body', 'body': data, 'more_body': more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _compressible(status:int, headers:MutableHeaders) -> bool:
+        if status < 200 or status in (204, 304):
+            return False
+        if 'content-encoding' in headers or 'content-range' in headers:
+            return False
+        content_type = headers.get('content-type', '')
+        return content_type.startswith(_COMPRESSIBLE_TYPES) or '+json' in content_type
@@ -0,0 +1,97 @@
+'''
+启动耗时统计
+'''
+import subprocess
+import sys
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Any, Iterator
+
+
+class StartupTimer:
+    '''
+    按阶段记录启动耗时（秒）
+    '''
+    def __init__(self):
+        self.phases: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name:str) -> Iterator[None]:
+        '''记录一个阶段的耗时'''
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + perf_counter() - start
+
+    def summary(self) -> str:
+        '''单行摘要，用于日志'''
+        return ' '.join(f'{name}={seconds * 1000:.1f}ms' for name, seconds in self.phases.items())
+
+startup_timer = StartupTimer()
+
+
+def import_breakdown(statement:str = 'import main') -> list[tuple[str, float]]:
+    '''
+    在新的解释器中用 -X importtime 执行statement，返回顶层导入的累计耗时（秒），按耗时降序；
+    每个顶层导入后紧跟其直接子导入（名称带两个空格缩进），同样按耗时降序
+
+    必须用新进程：当前进程已导入的模块不会再计时。
+    '''
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        capture_output=True, text=True, check=True
+    )
+    groups: list[tuple[tuple[str, float], list[tuple[str, float]]]] = []
+    children: list[tuple[str, float]] = []
+    # importtime先输出子模块再输出父模块，名称前每层缩进两个空格
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        entry = (name[1:].rstrip(), int(cumulative) / 1_000_000)
+        depth = (len(entry[0]) - len(entry[0].lstrip())) // 2
+        if depth == 1:
+            children.append(entry)
+        elif depth == 0:
+            groups.append((entry, sorted(children, key=lambda item: item[1], reverse=True)))
+            children = []
+    breakdown = []
+    for parent, parent_children in sorted(groups, key=lambda group: group[0][1], reverse=True):
+        breakdown.append(parent)
+        breakdown.extend(parent_children)
+    return breakdown
+
+async def asgi_get(app:Any, target:str) -> int:
+    '''
+    不经过网络直接向ASGI应用发送一个GET请求，返回状态码
+    '''
+    path, _, query = target.partition('?')
+    status = 0
+
+    async def receive() -> dict:
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message:dict) -> None:
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', b'localhost')],
+        'client': ('127.0.0.1', 0),
+        'server': ('127.0.0.1', 80),
+    }
+    await app(scope, receive, send)
+    return status
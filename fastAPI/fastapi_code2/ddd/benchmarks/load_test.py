@@ -0,0 +1,251 @@
+'''
+服务压测：以固定并发驱动注册、登录、订单查询场景，报告RPS和延迟分位数并保存为JSON
+
+先用benchmarks.seed_data生成数据库，再运行（在ddd目录下，需要bench依赖组：uv sync --group bench）：
+    python -m benchmarks.load_test --db data/bench-100000u-1000000o.db --scenario orders --mode asgi
+    python -m benchmarks.load_test --db data/bench-100000u-1000000o.db --scenario login --mode socket --workers 4
+
+asgi模式在同一进程、同一事件循环中直接调用应用，客户端开销计入结果；
+socket模式启动serve.py（或用--url指定已运行的服务），经过真实的TCP连接。
+结果写入benchmarks/results/，文件中包含参数、数据量和git提交，便于对比不同版本。
+'''
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import sqlite3
+import subprocess
+import sys
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Awaitable, Callable
+
+import httpx
+
+from benchmarks.seed_data import SEED_PASSWORD, seed_username
+from benchmarks.stats import percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+Scenario = Callable[[httpx.AsyncClient, random.Random, str], Awaitable[httpx.Response]]
+
+
+@dataclass
+class LoadResult:
+    '''
+    一次压测的结果
+    '''
+    scenario: str
+    mode: str
+    concurrency: int
+    duration: float
+    requests: int
+    rps: float
+    latency_ms: dict[str, float]
+    status: dict[str, int]
+    errors: int
+    params: dict = field(default_factory=dict)
+
+
+def make_scenarios(users:int) -> dict[str, Scenario]:
+    '''
+    场景：register写入新用户，login随机登录已有用户，orders随机查询用户的第一页订单
+    '''
+    async def register(client:httpx.AsyncClient, rng:random.Random, tag:str) -> httpx.Response:
+        return await client.post('/api/v1/auth/register', json={'username': tag, 'password': SEED_PASSWORD})
+
+    async def login(client:httpx.AsyncClient, rng:random.Random, tag:str) -> httpx.Response:
+        username = seed_username(rng.randrange(users))
+        return await client.post('/api/v1/auth/login', json={'username': username, 'password': SEED_PASSWORD})
+
+    async def orders(client:httpx.AsyncClient, rng:random.Random, tag:str) -> httpx.Response:
+        return await client.get('/api/v1/orders/', params={'user_id': rng.randint(1, users), 'limit': 20})
+
+    return {'register': register, 'login': login, 'orders': orders}
+
+
+async def drive(
+        client:httpx.AsyncClient,
+        scenario:Scenario,
+        concurrency:int,
+        duration:float,
+        warmup:float,
+        seed:int) -> tuple[list[float], Counter, int, float]:
+    '''
+    concurrency个协程各自循环发请求；预热期间的请求不计入，返回延迟（秒）、状态码计数、异常数和统计时长
+    '''
+    run_id = f'{os.getpid()}-{int(time.time())}'
+    latencies: list[float] = []
+    status: Counter = Counter()
+    errors = 0
+    begin = time.perf_counter()
+    measure_from = begin + warmup
+    stop_at = measure_from + duration
+
+    async def worker(worker_id:int) -> None:
+        nonlocal errors
+        rng = random.Random(seed + worker_id)
+        n = 0
+        while True:
+            start = time.perf_counter()
+            if start >= stop_at:
+                return
+            n += 1
+            try:
+                response = await scenario(client, rng, f'bench-{run_id}-{worker_id}-{n}')
+                code = str(response.status_code)
+            except httpx.HTTPError:
+                code = None
+            end = time.perf_counter()
+            if start >= measure_from:
+                if code is None:
+                    errors += 1
+                else:
+                    status[code] += 1
+                    latencies.append(end - start)
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return latencies, status, errors, time.perf_counter() - measure_from
+
+async def run_asgi(args:argparse.Namespace, scenario:Scenario):
+    '''在进程内直接调用ASGI应用'''
+    # seed_data已导入配置，这里直接修改配置对象；lifespan启动时才读取db_url
+    from config.settngs import settings
+    settings.db_url = f'sqlite://{os.path.abspath(args.db)}'
+    import main
+    app = main.app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            return await drive(client, scenario, args.concurrency, args.duration, args.warmup, args.seed)
+
+async def wait_until_ready(url:str, timeout:float) -> None:
+    '''轮询根路由直到服务可用'''
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=url) as client:
+        while True:
+            try:
+                if (await client.get('/')).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f'{url} 在 {timeout}s 内没有就绪')
+            await asyncio.sleep(0.2)
+
+async def run_socket(args:argparse.Namespace, scenario:Scenario):
+    '''经TCP访问服务；未指定--url时启动serve.py并在结束后关闭'''
+    server = None
+    url = args.url
+    if url is None:
+        url = f'http://127.0.0.1:{args.port}'
+        env = dict(os.environ, DB_URL=f'sqlite://{os.path.abspath(args.db)}')
+        server = subprocess.Popen(
+            [sys.executable, 'serve.py', '--port', str(args.port), '--workers', str(args.workers)],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+    try:
+        await wait_until_ready(url, 60)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+            return await drive(client, scenario, args.concurrency, args.duration, args.warmup, args.seed)
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGTERM)
+            server.wait(60)
+
+def seeded_counts(db_path:str) -> tuple[int, int]:
+    '''读取压测库中seed_data写入的用户数和订单数（按最大id，register场景新增的用户不计入）'''
+    with sqlite3.connect(f'file:{db_path}?mode=ro', uri=True) as connection:
+        users = connection.execute(
+            "SELECT COALESCE(MAX(id), 0) FROM users WHERE username GLOB 'user[0-9]*'"
+        ).fetchone()[0]
+        orders = connection.execute('SELECT COALESCE(MAX(id), 0) FROM orders').fetchone()[0]
+    return users, orders
+
+def git_commit() -> str:
+    '''当前git提交，不在git仓库中时返回空字符串'''
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='服务压测')
+    parser.add_argument('--db', required=True, help='benchmarks.seed_data生成的数据库')
+    parser.add_argument('--scenario', choices=['register', 'login', 'orders'], default='orders')
+    parser.add_argument('--mode', choices=['asgi', 'socket'], default='asgi')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=20.0, help='统计时长（秒）')
+    parser.add_argument('--warmup', type=float, default=3.0, help='预热时长（秒），不计入结果')
+    parser.add_argument('--seed', type=int, default=0, help='随机数种子')
+    parser.add_argument('--url', help='socket模式下压测已运行的服务，不再启动serve.py')
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--workers', type=int, default=1, help='socket模式下serve.py的worker数')
+    parser.add_argument('--output', help='结果JSON路径，默认写入benchmarks/results/')
+    args = parser.parse_args()
+
+    users, orders = seeded_counts(args.db)
+    if users == 0:
+        parser.error(f'{args.db} 中没有用户，请先运行 benchmarks.seed_data')
+    scenario = make_scenarios(users)[args.scenario]
+    runner = run_asgi if args.mode == 'asgi' else run_socket
+    latencies, status, errors, elapsed = asyncio.run(runner(args, scenario))
+
+    latencies.sort()
+    result = LoadResult(
+        scenario=args.scenario,
+        mode=args.mode,
+        concurrency=args.concurrency,
+        duration=round(elapsed, 3),
+        requests=len(latencies),
+        rps=round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+        latency_ms={
+            name: round(value * 1000, 3)
+            for name, value in (
+                ('p50', percentile(latencies, 50)),
+                ('p95', percentile(latencies, 95)),
+                ('p99', percentile(latencies, 99)),
+                ('max', latencies[-1] if latencies else 0.0),
+                ('mean', sum(latencies) / len(latencies) if latencies else 0.0),
+            )
+        },
+        status=dict(sorted(status.items())),
+        errors=errors,
+        params={
+            'db': os.path.abspath(args.db),
+            'users': users,
+            'orders': orders,
+            'workers': args.workers if args.mode == 'socket' and not args.url else None,
+            'url': args.url,
+            'warmup': args.warmup,
+            'seed': args.seed,
+            'git_commit': git_commit(),
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+        },
+    )
+
+    print(
+        f'{result.scenario}/{result.mode} 并发={result.concurrency} 请求={result.requests} '
+        f'RPS={result.rps:.1f} p50={result.latency_ms["p50"]:.2f}ms p95={result.latency_ms["p95"]:.2f}ms '
+        f'p99={result.latency_ms["p99"]:.2f}ms 状态={result.status} 异常={result.errors}'
+    )
+    output = args.output or os.path.join(
+        RESULTS_DIR, f'{datetime.now():%Y%m%d-%H%M%S}-{result.scenario}-{result.mode}.json'
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(asdict(result), f, ensure_ascii=False, indent=2)
+    print(f'结果已保存到 {output}')
+
+
+if __name__ == '__main__':
+    main()
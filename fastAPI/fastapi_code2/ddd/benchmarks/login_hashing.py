@@ -0,0 +1,107 @@
+'''
+登录哈希基准测试：200个并发登录的延迟分布与事件循环响应性
+
+对比在事件循环内直接计算KDF（inline）与在线程池中计算（executor）两种方式。
+运行方式（在ddd目录下）：
+    python -m benchmarks.login_hashing --concurrency 200 --workers 4
+'''
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from tortoise import Tortoise
+
+from app.domain.user.entity import User
+from app.application.user.commands.login_user import LoginUserCommand, LoginUserHandler
+from app.infrastructure.repository.user_impl import UserRepositoryImpl
+from app.infrastructure.security.password_hasher import PasswordHasherImpl
+from benchmarks.stats import percentile
+
+
+class InlinePasswordHasher(PasswordHasherImpl):
+    '''
+    在事件循环线程内直接计算KDF，作为对照组
+    '''
+    async def hash(self, password:str) -> str:
+        return self.hash_sync(password)
+
+    async def verify(self, password:str, hashed:str) -> bool:
+        return self.verify_sync(password, hashed)
+
+
+async def probe_loop_lag(stop:asyncio.Event, interval:float = 0.005) -> list[float]:
+    '''
+    周期性sleep，记录实际唤醒时间超出预期的部分（事件循环阻塞时长）
+    '''
+    lags = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+    return lags
+
+
+async def run_logins(handler:LoginUserHandler, users:int, concurrency:int) -> tuple[list[float], list[float]]:
+    '''
+    并发执行登录，返回每次登录的延迟和事件循环延迟采样
+    '''
+    async def login(i:int) -> float:
+        start = time.perf_counter()
+        await handler.handle(LoginUserCommand(username=f'bench{i % users}', password='secret'))
+        return time.perf_counter() - start
+
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_loop_lag(stop))
+    latencies = await asyncio.gather(*(login(i) for i in range(concurrency)))
+    stop.set()
+    return list(latencies), await probe
+
+
+def report(name:str, latencies:list[float], lags:list[float], elapsed:float) -> None:
+    print(
+        f'{name:<9} total={elapsed:7.3f}s '
+        f'p50={percentile(latencies, 50) * 1000:8.1f}ms '
+        f'p99={percentile(latencies, 99) * 1000:8.1f}ms '
+        f'loop_lag_max={max(lags or [0]) * 1000:8.1f}ms '
+        f'loop_lag_p99={percentile(lags, 99) * 1000:8.1f}ms'
+    )
+
+
+async def main(args:argparse.Namespace) -> None:
+    db_path = os.path.join(tempfile.mkdtemp(prefix='ddd-bench-'), 'bench.db')
+    await Tortoise.init(db_url=f'sqlite://{db_path}', modules={'models': ['app.infrastructure.database.orm_models']})
+    await Tortoise.generate_schemas()
+    try:
+        repository = UserRepositoryImpl()
+        options = dict(
+            algorithm=args.algorithm,
+            scrypt_n=args.scrypt_n,
+            pbkdf2_iterations=args.pbkdf2_iterations,
+            max_workers=args.workers
+        )
+        seed_hasher = PasswordHasherImpl(**options)
+        hashed = await seed_hasher.hash('secret')
+        await repository.save_many([User(id=None, username=f'bench{i}', password=hashed) for i in range(args.users)])
+
+        for name, hasher in (('inline', InlinePasswordHasher(**options)), ('executor', seed_hasher)):
+            handler = LoginUserHandler(repository, hasher)
+            start = time.perf_counter()
+            latencies, lags = await run_logins(handler, args.users, args.concurrency)
+            report(name, latencies, lags, time.perf_counter() - start)
+            hasher.close()
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='登录哈希基准测试')
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4)
+    parser.add_argument('--algorithm', default='scrypt', choices=['scrypt', 'pbkdf2_sha256'])
+    parser.add_argument('--scrypt-n', type=int, default=2 ** 14)
+    parser.add_argument('--pbkdf2-iterations', type=int, default=600_000)
+    asyncio.run(main(parser.parse_args()))
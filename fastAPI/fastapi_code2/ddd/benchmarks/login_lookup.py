@@ -0,0 +1,59 @@
+'''
+登录查询基准测试：find_by_username（完整ORM对象）与find_credentials（只取id和密码哈希）的CPU耗时对比
+
+不含密码哈希验证，只比较每次登录在查库和构建对象上的开销。
+运行方式（在ddd目录下）：
+    python -m benchmarks.login_lookup --users 100000 --lookups 20000
+'''
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from tortoise import Tortoise
+
+from config.settngs import settings
+from app.infrastructure.database.sqlite import build_tortoise_config, sqlite_pragmas
+from app.infrastructure.repository.user_impl import UserRepositoryImpl
+from benchmarks.seed_data import insert_rows, seed_username
+
+
+async def timed(label:str, lookup, usernames:list[str]) -> None:
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    for username in usernames:
+        assert await lookup(username) is not None
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+    print(f'{label:<18} CPU {cpu / len(usernames) * 1e6:7.1f}us/次  墙钟 {wall / len(usernames) * 1e6:7.1f}us/次')
+
+
+async def main(args:argparse.Namespace) -> None:
+    db_path = os.path.join(tempfile.mkdtemp(prefix='ddd-bench-'), 'bench.db')
+    await Tortoise.init(config=build_tortoise_config(f'sqlite://{db_path}', sqlite_pragmas(settings)))
+    await Tortoise.generate_schemas()
+    try:
+        created_at = '2025-01-01 00:00:00.000000+00:00'
+        await insert_rows(
+            'INSERT INTO users (id, username, password, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+            ((i + 1, seed_username(i), 'scrypt$' + 'x' * 120, created_at, created_at) for i in range(args.users)),
+            args.users, 50_000, '用户'
+        )
+        rng = random.Random(0)
+        usernames = [seed_username(rng.randrange(args.users)) for _ in range(args.lookups)]
+        repository = UserRepositoryImpl()
+        # 交替运行两轮，减少缓存预热顺序的影响
+        for _ in range(2):
+            await timed('find_by_username', repository.find_by_username, usernames)
+            await timed('find_credentials', repository.find_credentials, usernames)
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='登录查询基准测试')
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--lookups', type=int, default=20_000)
+    asyncio.run(main(parser.parse_args()))
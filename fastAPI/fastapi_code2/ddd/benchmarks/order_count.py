@@ -0,0 +1,78 @@
+'''
+订单总数基准测试：COUNT(*) 与增量计数表对比
+
+默认向临时库写入100万订单，其中一个重度用户占10%。
+运行方式（在ddd目录下）：
+    python -m benchmarks.order_count --orders 1000000 --users 1000
+'''
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from tortoise import Tortoise
+
+from app.domain.shared.vo import UserID
+from app.infrastructure.database.orm_models import OrderORM
+from app.infrastructure.repository.order_impl import OrderRepositoryImpl
+
+HEAVY_USER_ID = 1
+
+
+async def seed_orders(orders:int, users:int, batch_size:int = 10_000) -> None:
+    '''
+    分批bulk_create写入订单，10%属于重度用户
+    '''
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    for start in range(0, orders, batch_size):
+        await OrderORM.bulk_create([
+            OrderORM(
+                user_id=HEAVY_USER_ID if i % 10 == 0 else 2 + i % (users - 1),
+                order_number=f'ORD-{i:010d}',
+                total_amount=Decimal('9.99'),
+                status='已完成',
+                created_at=base + timedelta(seconds=i)
+            )
+            for i in range(start, min(start + batch_size, orders))
+        ])
+
+
+async def timed(label:str, func, iterations:int) -> None:
+    result = None
+    start = time.perf_counter()
+    for _ in range(iterations):
+        result = await func()
+    elapsed = time.perf_counter() - start
+    print(f'{label:<12} result={result:<9} avg={elapsed / iterations * 1e6:10.1f}us')
+
+
+async def main(args:argparse.Namespace) -> None:
+    db_path = os.path.join(tempfile.mkdtemp(prefix='ddd-bench-'), 'bench.db')
+    await Tortoise.init(db_url=f'sqlite://{db_path}', modules={'models': ['app.infrastructure.database.orm_models']})
+    await Tortoise.generate_schemas()
+    try:
+        start = time.perf_counter()
+        await seed_orders(args.orders, args.users)
+        print(f'写入 {args.orders} 订单耗时 {time.perf_counter() - start:.1f}s')
+
+        repository = OrderRepositoryImpl()
+        start = time.perf_counter()
+        rebuilt = await repository.rebuild_counters()
+        print(f'重建 {rebuilt} 个用户计数耗时 {time.perf_counter() - start:.3f}s')
+
+        user_id = UserID(HEAVY_USER_ID)
+        await timed('COUNT(*)', lambda: OrderORM.filter(user_id=HEAVY_USER_ID).count(), args.iterations)
+        await timed('counter', lambda: repository.count_by_user(user_id), args.iterations)
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='订单总数基准测试')
+    parser.add_argument('--orders', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--iterations', type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
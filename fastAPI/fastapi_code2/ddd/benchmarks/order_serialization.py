@@ -0,0 +1,68 @@
+'''
+订单列表序列化基准测试：每页100条订单的序列化开销
+
+before 复现原来的路径：逐条构造OrderResponse和GetOrdersResponse（第一次校验），
+FastAPI按response_model再校验一次（第二次校验），再经jsonable_encoder和json.dumps输出。
+after 为当前路径：缓存的TypeAdapter直接把OrderDTO序列化为JSON字节。
+运行方式（在ddd目录下）：
+    python -m benchmarks.order_serialization --orders 100 --iterations 5000
+'''
+import argparse
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.application.user.queries.get_orders import OrderDTO
+from app.interface.api.v1.order_router import GetOrdersResponse, OrderResponse, render_orders
+
+_response_adapter = TypeAdapter(GetOrdersResponse)
+
+
+def before(orders:list[OrderDTO]) -> bytes:
+    response = GetOrdersResponse(
+        orders=[
+            OrderResponse(
+                id=order.id,
+                order_number=order.order_number,
+                total_amount=order.total_amount,
+                status=order.status,
+                created_at=order.created_at,
+                updated_at=order.updated_at
+            )
+            for order in orders],
+        total=len(orders),
+        limit=len(orders),
+        next_cursor=None
+    )
+    validated = _response_adapter.validate_python(response.model_dump())
+    return json.dumps(jsonable_encoder(validated), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def after(orders:list[OrderDTO]) -> bytes:
+    return render_orders({'orders': orders, 'total': len(orders), 'limit': len(orders), 'next_cursor': None})
+
+
+def main(args:argparse.Namespace) -> None:
+    orders = [
+        OrderDTO(
+            id=i, order_number=f'ORD-{i:08d}', total_amount=99.99, status='已完成',
+            created_at='2025-05-01 10:00:00', updated_at='2025-05-01 10:00:00'
+        )
+        for i in range(args.orders)
+    ]
+    assert json.loads(before(orders)) == json.loads(after(orders))
+    for name, func in (('before', before), ('after', after)):
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            func(orders)
+        elapsed = time.perf_counter() - start
+        print(f'{name:<7} 每页 {elapsed / args.iterations * 1e6:8.1f}us')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='订单列表序列化基准测试')
+    parser.add_argument('--orders', type=int, default=100)
+    parser.add_argument('--iterations', type=int, default=5000)
+    main(parser.parse_args())
@@ -0,0 +1,66 @@
+'''
+注册写入基准测试：逐条提交与组提交的吞吐对比
+
+运行方式（在ddd目录下）：
+    python -m benchmarks.register_throughput --users 5000 --concurrency 200
+'''
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from tortoise import Tortoise
+
+from config.settngs import settings
+from app.domain.user.entity import User
+from app.infrastructure.database.sqlite import build_tortoise_config, sqlite_pragmas
+from app.infrastructure.repository.user_impl import UserRepositoryImpl
+from app.infrastructure.repository.user_batching import BatchingUserRepository
+
+
+async def register_all(repository, prefix:str, users:int, concurrency:int) -> float:
+    '''
+    用固定并发写入users个新用户，返回每秒写入行数
+    '''
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def register(i:int) -> None:
+        async with semaphore:
+            await repository.save(User(id=None, username=f'{prefix}{i}', password='hashed'))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(register(i) for i in range(users)))
+    return users / (time.perf_counter() - start)
+
+
+async def main(args:argparse.Namespace) -> None:
+    db_path = os.path.join(tempfile.mkdtemp(prefix='ddd-bench-'), 'bench.db')
+    pragmas = dict(sqlite_pragmas(settings), synchronous=args.synchronous)
+    await Tortoise.init(config=build_tortoise_config(f'sqlite://{db_path}', pragmas))
+    await Tortoise.generate_schemas()
+    try:
+        plain = UserRepositoryImpl()
+        print(f'逐条提交  {await register_all(plain, "plain", args.users, args.concurrency):8.0f} 行/秒')
+
+        batching = BatchingUserRepository(plain, max_batch=args.max_batch, max_delay=args.max_delay_ms / 1000)
+        await batching.start()
+        rate = await register_all(batching, 'batch', args.users, args.concurrency)
+        await batching.close()
+        stats = batching.stats
+        print(
+            f'组提交    {rate:8.0f} 行/秒  批次={stats.batches} 平均批大小={stats.avg_batch_size:.1f} '
+            f'最大批={stats.max_batch_size} 最大排队+提交={stats.max_wait_seconds * 1000:.1f}ms'
+        )
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='注册写入基准测试')
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--max-batch', type=int, default=100)
+    parser.add_argument('--max-delay-ms', type=float, default=5.0)
+    parser.add_argument('--synchronous', default='FULL', choices=['OFF', 'NORMAL', 'FULL', 'EXTRA'])
+    asyncio.run(main(parser.parse_args()))
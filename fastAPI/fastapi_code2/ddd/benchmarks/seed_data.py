@@ -0,0 +1,129 @@
+'''
+压测数据生成：向data/下的SQLite库批量写入用户和订单
+
+所有用户共用同一个密码哈希（SEED_PASSWORD），只需计算一次；订单按user_id轮流分配给用户。
+写入使用原生INSERT的executemany，每批一个事务，最后重建订单计数表并ANALYZE。
+运行方式（在ddd目录下）：
+    python -m benchmarks.seed_data --users 1000000 --orders 10000000
+'''
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+
+from config.settngs import settings
+from app.infrastructure.database.schema import ensure_schema
+from app.infrastructure.database.sqlite import build_tortoise_config, sqlite_pragmas
+from app.infrastructure.repository.order_impl import OrderRepositoryImpl
+from app.infrastructure.security.password_hasher import PasswordHasherImpl
+
+SEED_PASSWORD = 'bench-password'
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+BASE_TIME = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def seed_username(i:int) -> str:
+    '''第i个（从0开始）压测用户的用户名，对应id为i+1'''
+    return f'user{i:08d}'
+
+def default_db_path(users:int, orders:int) -> str:
+    '''按数据量命名的压测库路径'''
+    return os.path.join(DATA_DIR, f'bench-{users}u-{orders}o.db')
+
+
+async def insert_rows(sql:str, rows, total:int, batch_size:int, label:str) -> None:
+    '''
+    按batch_size分批executemany，每批一个事务
+    '''
+    start = time.perf_counter()
+    batch = []
+    done = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            async with in_transaction() as connection:
+                await connection.execute_many(sql, batch)
+            done += len(batch)
+            batch = []
+            print(f'\r{label} {done}/{total} {done / (time.perf_counter() - start):,.0f} 行/秒', end='', flush=True)
+    if batch:
+        async with in_transaction() as connection:
+            await connection.execute_many(sql, batch)
+        done += len(batch)
+    print(f'\r{label} {done}/{total} 耗时 {time.perf_counter() - start:.1f}s' + ' ' * 20)
+
+async def seed(db_path:str, users:int, orders:int, batch_size:int) -> None:
+    '''
+    建表并写入数据
+    '''
+    # 一次性导入不需要逐事务落盘
+    pragmas = dict(sqlite_pragmas(settings), synchronous='OFF')
+    await Tortoise.init(config=build_tortoise_config(f'sqlite://{db_path}', pragmas))
+    try:
+        await ensure_schema()
+        hasher = PasswordHasherImpl(
+            algorithm=settings.password_hash_algorithm,
+            scrypt_n=settings.password_scrypt_n,
+            scrypt_r=settings.password_scrypt_r,
+            scrypt_p=settings.password_scrypt_p,
+            pbkdf2_iterations=settings.password_pbkdf2_iterations,
+            max_workers=1
+        )
+        password = await hasher.hash(SEED_PASSWORD)
+        hasher.close()
+
+        created_at = str(BASE_TIME)
+        await insert_rows(
+            'INSERT INTO users (id, username, password, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+            ((i + 1, seed_username(i), password, created_at, created_at) for i in range(users)),
+            users, batch_size, '用户'
+        )
+        await insert_rows(
+            'INSERT INTO orders (id, user_id, order_number, total_amount, status, created_at, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (
+                (i + 1, 1 + i % users, f'ORD-{i:010d}', '9.99', '已完成', ts, ts)
+                for i in range(orders)
+                for ts in (str(BASE_TIME + timedelta(seconds=i)),)
+            ),
+            orders, batch_size, '订单'
+        )
+
+        start = time.perf_counter()
+        counted = await OrderRepositoryImpl().rebuild_counters()
+        connection = Tortoise.get_connection('default')
+        await connection.execute_script('ANALYZE')
+        print(f'重建 {counted} 个用户的订单计数并ANALYZE，耗时 {time.perf_counter() - start:.1f}s')
+    finally:
+        await Tortoise.close_connections()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='生成压测数据库')
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--orders', type=int, default=1_000_000)
+    parser.add_argument('--db', help='数据库路径，默认 data/bench-<users>u-<orders>o.db')
+    parser.add_argument('--batch-size', type=int, default=50_000)
+    parser.add_argument('--force', action='store_true', help='数据库已存在时删除重建')
+    args = parser.parse_args()
+    if args.users <= 0:
+        parser.error('--users 必须大于0')
+
+    db_path = args.db or default_db_path(args.users, args.orders)
+    if os.path.exists(db_path):
+        if not args.force:
+            parser.error(f'{db_path} 已存在，使用 --force 重建')
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    print(f'写入 {db_path}')
+    asyncio.run(seed(db_path, args.users, args.orders, args.batch_size))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+'''
+SQLite PRAGMA配置基准测试：各配置下的单行写入与分页读取吞吐
+
+每个配置使用独立的临时库；写入为逐条事务提交（每次提交都要落盘），读取为订单分页查询。
+运行方式（在ddd目录下）：
+    python -m benchmarks.sqlite_profiles --writes 2000 --reads 5000
+'''
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from decimal import Decimal
+
+from tortoise import Tortoise
+
+from config.settngs import settings
+from app.domain.order.entity import Order
+from app.domain.shared.vo import UserID
+from app.infrastructure.database.sqlite import build_tortoise_config, check_pragmas, sqlite_pragmas
+from app.infrastructure.repository.order_impl import OrderRepositoryImpl
+
+PROFILES = {
+    # SQLite编译默认值
+    'sqlite-default': dict(journal_mode='DELETE', synchronous='FULL', mmap_size=0, cache_size=-2000, temp_store='DEFAULT', busy_timeout=0),
+    'wal-full': dict(journal_mode='WAL', synchronous='FULL', mmap_size=0, cache_size=-2000, temp_store='DEFAULT', busy_timeout=5000),
+    # 当前Settings中的配置
+    'settings': sqlite_pragmas(settings),
+    # 不落盘，只用于观察上限，不要用于生产
+    'unsafe': dict(journal_mode='WAL', synchronous='OFF', mmap_size=256 * 1024 * 1024, cache_size=-65536, temp_store='MEMORY', busy_timeout=5000),
+}
+
+
+async def run_profile(name:str, pragmas:dict, writes:int, reads:int) -> None:
+    db_path = os.path.join(tempfile.mkdtemp(prefix='ddd-bench-'), 'bench.db')
+    await Tortoise.init(config=build_tortoise_config(f'sqlite://{db_path}', pragmas))
+    await Tortoise.generate_schemas()
+    try:
+        await check_pragmas(pragmas)
+        repository = OrderRepositoryImpl()
+        start = time.perf_counter()
+        for i in range(writes):
+            await repository.save(Order(
+                id=None, user_id=UserID(1 + i % 10), order_number=f'ORD-{i:08d}',
+                total_amount=Decimal('9.99'), status='待处理'
+            ))
+        write_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(reads):
+            await repository.find_page_by_user(UserID(1 + i % 10), 20)
+        read_elapsed = time.perf_counter() - start
+        print(f'{name:<15} 写入 {writes / write_elapsed:9.0f} 行/秒   读取 {reads / read_elapsed:9.0f} 页/秒')
+    finally:
+        await Tortoise.close_connections()
+
+
+async def main(args:argparse.Namespace) -> None:
+    for name in args.profiles or PROFILES:
+        await run_profile(name, PROFILES[name], args.writes, args.reads)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='SQLite PRAGMA配置基准测试')
+    parser.add_argument('--writes', type=int, default=2000)
+    parser.add_argument('--reads', type=int, default=5000)
+    parser.add_argument('--profiles', nargs='*', choices=list(PROFILES))
+    asyncio.run(main(parser.parse_args()))
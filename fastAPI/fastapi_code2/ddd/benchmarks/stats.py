@@ -0,0 +1,15 @@
+'''
+基准测试共用的统计函数
+'''
+import math
+
+
+def percentile(samples:list[float], pct:float) -> float:
+    '''
+    最近秩法计算百分位（pct取0~100），样本为空时返回0
+    '''
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
@@ -0,0 +1,77 @@
+'''
+用户实体加载基准测试：ORM对象+校验构造 与 列投影+可信构造 的耗时和内存对比
+
+运行方式（在ddd目录下）：
+    python -m benchmarks.user_hydration --users 1000000
+'''
+import argparse
+import asyncio
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from tortoise import Tortoise
+
+from config.settngs import settings
+from app.infrastructure.database.mappers import UserMapper
+from app.infrastructure.database.orm_models import UserORM
+from app.infrastructure.database.sqlite import build_tortoise_config, sqlite_pragmas
+from app.infrastructure.repository.user_impl import UserRepositoryImpl
+from benchmarks.seed_data import insert_rows, seed_username
+
+
+async def orm_find_all() -> int:
+    '''改动前的find_all：创建ORM对象（含时间字段解析）后逐个校验构造实体'''
+    orm_models = await UserORM.all()
+    return len([UserMapper.to_entity(orm_model) for orm_model in orm_models])
+
+async def projected_find_all() -> int:
+    return len(await UserRepositoryImpl().find_all())
+
+async def streamed_iter_all(batch_size:int) -> int:
+    count = 0
+    async for _ in UserRepositoryImpl().iter_all(batch_size):
+        count += 1
+    return count
+
+
+async def measure(label:str, func) -> None:
+    gc.collect()
+    start = time.perf_counter()
+    count = await func()
+    elapsed = time.perf_counter() - start
+
+    # 内存峰值单独测一遍，tracemalloc本身会拖慢执行
+    gc.collect()
+    tracemalloc.start()
+    await func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{label:<22} rows={count:<9} {elapsed:7.2f}s  {count / elapsed:10,.0f} 行/秒  峰值内存={peak / 2 ** 20:8.1f}MiB')
+
+
+async def main(args:argparse.Namespace) -> None:
+    db_path = os.path.join(tempfile.mkdtemp(prefix='ddd-bench-'), 'bench.db')
+    await Tortoise.init(config=build_tortoise_config(f'sqlite://{db_path}', dict(sqlite_pragmas(settings), synchronous='OFF')))
+    await Tortoise.generate_schemas()
+    try:
+        created_at = '2025-01-01 00:00:00+00:00'
+        await insert_rows(
+            'INSERT INTO users (id, username, password, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+            ((i + 1, seed_username(i), 'scrypt$' + 'x' * 120, created_at, created_at) for i in range(args.users)),
+            args.users, 50_000, '用户'
+        )
+        await measure('ORM + 校验构造', orm_find_all)
+        await measure('投影 + 可信构造', projected_find_all)
+        await measure(f'iter_all({args.batch_size})', lambda: streamed_iter_all(args.batch_size))
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='用户实体加载基准测试')
+    parser.add_argument('--users', type=int, default=200_000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,47 @@
+'''
+用户名布隆过滤器基准测试：内存占用、插入/查询延迟与实测误判率
+
+运行方式（在ddd目录下）：
+    python -m benchmarks.username_bloom --names 10000000 --fp-rate 0.01
+'''
+import argparse
+import time
+
+from app.infrastructure.cache.bloom_filter import BloomFilter
+
+
+def main(args:argparse.Namespace) -> None:
+    bloom = BloomFilter(args.names, args.fp_rate)
+    print(
+        f'容量={args.names} 目标误判率={args.fp_rate} '
+        f'位数={bloom.num_bits} 哈希数={bloom.num_hashes} 内存={bloom.size_in_bytes / 1024 / 1024:.1f}MiB'
+    )
+
+    start = time.perf_counter()
+    for i in range(args.names):
+        bloom.add(f'user{i}')
+    elapsed = time.perf_counter() - start
+    print(f'插入 {args.names} 个用户名耗时 {elapsed:.1f}s，平均 {elapsed / args.names * 1e6:.2f}us')
+
+    probes = args.probes
+    start = time.perf_counter()
+    for i in range(probes):
+        bloom.might_contain(f'user{i}')
+    elapsed = time.perf_counter() - start
+    print(f'查询已存在用户名平均 {elapsed / probes * 1e6:.2f}us')
+
+    false_positives = 0
+    start = time.perf_counter()
+    for i in range(probes):
+        if bloom.might_contain(f'absent{i}'):
+            false_positives += 1
+    elapsed = time.perf_counter() - start
+    print(f'查询不存在用户名平均 {elapsed / probes * 1e6:.2f}us，实测误判率 {false_positives / probes:.4%}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='用户名布隆过滤器基准测试')
+    parser.add_argument('--names', type=int, default=10_000_000)
+    parser.add_argument('--fp-rate', type=float, default=0.01)
+    parser.add_argument('--probes', type=int, default=1_000_000)
+    main(parser.parse_args())
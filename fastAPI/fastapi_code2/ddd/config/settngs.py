@@ -15,11 +15,100 @@ class Settings(BaseSettings):
     app_name: str = "FastAPI DDD"
     app_version: str = "0.1.0"
     debug: bool = True
+    # 会话令牌的签名密钥，非调试模式下必须设置为至少32字节的随机值，否则启动失败
     secret_key: str = 'your-secret-key'
 
+    # 多进程启动配置（python serve.py），workers为0表示每个CPU核一个worker
+    serve_host: str = "127.0.0.1"
+    serve_port: int = 8000
+    serve_workers: int = 0
+    serve_loop: str = "auto"                 # auto / asyncio / uvloop
+    serve_http: str = "auto"                 # auto / h11 / httptools
+    serve_graceful_timeout: int = 30         # 秒，worker退出前等待进行中请求的时间
+
+    # 准入控制配置：按路由组限制并发，排队超过deadline的请求直接返回503
+    admission_enabled: bool = True
+    admission_auth_concurrency: int = 32
+    admission_orders_concurrency: int = 64
+    admission_queue_size: int = 256
+    admission_queue_timeout_ms: float = 1000.0
+    # 订单导出（流式响应，单个请求可能持续数秒）使用独立的闸门
+    admission_export_concurrency: int = 4
+    admission_export_queue_size: int = 8
+
+    # 批量请求配置（POST /api/v1/batch）：单批最多max_requests个子请求，最多max_concurrency个同时执行
+    batch_enabled: bool = True
+    batch_max_requests: int = 20
+    batch_max_concurrency: int = 8
+
+    # 响应压缩配置：按Accept-Encoding选择gzip/deflate，完整响应体小于minimum_size字节时不压缩
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024
+    compression_level: int = 5               # 1最快、9最小；JSON在5以上压缩率提升很小而CPU明显增加
+
+    # 指标配置：请求延迟直方图、数据库查询计时和/metrics
+    metrics_enabled: bool = True
+    # SQL检查：统计每个请求的查询数和读取行数，同一形状的SQL达到阈值次数时记录可能的N+1
+    sql_inspection_enabled: bool = False
+    sql_n_plus_one_threshold: int = 5
+
     # 数据库配置
     db_url: str = "sqlite://./data/test.db"
 
+    # SQLite性能配置（每个连接建立时执行对应的PRAGMA）
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"       # WAL模式下NORMAL只在检查点时fsync
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size: int = -65536          # 负数表示KiB，即64MiB页缓存
+    sqlite_temp_store: str = "MEMORY"
+    sqlite_busy_timeout: int = 5000          # 毫秒
+    # 查询使用的只读连接数（同一WAL文件上的多个连接），0表示读写共用一个连接
+    db_read_connections: int = 2
+
+    # 用户缓存配置
+    user_cache_enabled: bool = True
+    user_cache_max_size: int = 10000
+    user_cache_ttl: float = 60.0
+    # 不存在的用户（None）的缓存时间（秒），0表示不缓存
+    user_cache_negative_ttl: float = 1.0
+
+    # 注册写入组提交配置：最多攒max_size行或等待max_delay_ms毫秒后一次提交
+    user_write_batch_enabled: bool = True
+    user_write_batch_max_size: int = 100
+    user_write_batch_max_delay_ms: float = 5.0
+
+    # 订单列表条件请求：按用户订单版本戳生成弱ETag，If-None-Match匹配时直接返回304
+    order_etag_enabled: bool = True
+
+    # 订单导出每批读取的行数，决定流式导出的内存上限
+    order_export_batch_size: int = 500
+
+    # 用户名布隆过滤器配置（capacity为预期用户数，超出后误判率会上升）
+    username_bloom_enabled: bool = True
+    username_bloom_capacity: int = 1_000_000
+    username_bloom_fp_rate: float = 0.01
+
+    # 领域事件总线配置：提交后的副作用由工作协程异步批量处理，失败按指数退避重试
+    event_bus_workers: int = 2
+    event_bus_queue_size: int = 10000
+    event_bus_batch_size: int = 100
+    event_bus_max_retries: int = 3
+    event_bus_retry_backoff_ms: float = 100.0
+
+    # 密码哈希配置（algorithm: scrypt / pbkdf2_sha256）
+    password_hash_algorithm: str = "scrypt"
+    password_scrypt_n: int = 2 ** 14
+    password_scrypt_r: int = 8
+    password_scrypt_p: int = 1
+    password_pbkdf2_iterations: int = 600_000
+    password_hash_workers: int = 4
+
+    # 会话令牌配置：登录签发HMAC签名令牌，校验结果缓存在有界LRU中，吊销记录保存在进程内deny-list
+    # （多worker时退出登录只在当前worker生效，其他worker上令牌有效至过期）
+    session_token_ttl: int = 3600            # 秒
+    session_token_cache_size: int = 10000
+    session_token_cache_ttl: float = 300.0   # 秒，缓存命中时仍会检查令牌过期时间和deny-list
+
     # class Config:
     #     '''
     #     数据库配置类
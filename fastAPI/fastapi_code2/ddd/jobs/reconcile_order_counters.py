@@ -0,0 +1,31 @@
+'''
+订单计数对账任务：按订单表全量重建order_summaries
+
+批量导入订单或手工修复数据后运行（在ddd目录下）：
+    python -m jobs.reconcile_order_counters
+'''
+import asyncio
+import time
+
+from tortoise import Tortoise
+
+from config.settngs import settings
+from app.infrastructure.database.schema import ensure_schema
+from app.infrastructure.database.sqlite import build_tortoise_config, sqlite_pragmas
+from app.infrastructure.repository.order_impl import OrderRepositoryImpl
+
+
+async def main() -> None:
+    await Tortoise.init(config=build_tortoise_config(settings.db_url, sqlite_pragmas(settings)))
+    try:
+        # 与应用启动相同：建缺失的表并迁移已有表的新增列（如order_summaries.version）
+        await ensure_schema()
+        start = time.perf_counter()
+        users = await OrderRepositoryImpl().rebuild_counters()
+        print(f'已重建 {users} 个用户的订单计数，耗时 {time.perf_counter() - start:.3f}s')
+    finally:
+        await Tortoise.close_connections()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -1,15 +1,25 @@
 '''
 FastAPI 应用入口文件
 '''
+import logging
+import sys
 
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from tortoise import Tortoise
 
 
+# 这里只导入配置和数据库初始化需要的模块；路由、处理器、仓储、中间件和指标模块在create_app/lifespan中才导入，
+# 只用到配置或init_database的工具导入main时不需要加载它们（--profile-startup中单独列出这部分的导入耗时）
 from config.settngs import settings
-from app.interface.api.v1.order_router import router as order_router
-from app.interface.api.v1.auth_router import router as auth_router
+from app.interface.startup import startup_timer
+from app.infrastructure.database.instrumentation import instrument_db_clients
+from app.infrastructure.database.schema import ensure_schema
+from app.infrastructure.database.sqlite import (
+    build_tortoise_config, check_pragmas, read_connection_names, sqlite_pragmas, tortoise_init_options, SQLITE_ENGINE
+)
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
@@ -17,21 +27,39 @@ async def lifespan(app: FastAPI):
     '''
     应用生命周期管理
     '''
+    from app.interface.dependency import build_container
+
     # 启动时初始化数据库
-    await init_database()
+    config = await init_database()
+    # 创建依赖容器，预先构建仓储和处理器
+    with startup_timer.phase('container_startup'):
+        container = build_container(read_connection_names(config))
+        await container.startup()
+    app.state.container = container
+    logger.info('启动完成 %s', startup_timer.summary())
     yield
-    # 关闭时断开数据库连接
+    # 先释放容器中的资源，再断开数据库连接
+    await container.shutdown()
     await close_database()
 
-async def init_database():
+async def init_database() -> dict:
     '''
-    初始化数据库
+    初始化数据库，返回使用的Tortoise配置
     '''
-    await Tortoise.init(
-        db_url=settings.db_url,
-        modules={'models': ['app.infrastructure.database.orm_models']}
-    )
-    await Tortoise.generate_schemas()
+    pragmas = sqlite_pragmas(settings)
+    config = build_tortoise_config(settings.db_url, pragmas, settings.db_read_connections)
+    with startup_timer.phase('tortoise_init'):
+        await Tortoise.init(config=config, **tortoise_init_options())
+    if settings.metrics_enabled or settings.sql_inspection_enabled:
+        instrument_db_clients()
+    # 表结构未变化时跳过generate_schemas
+    with startup_timer.phase('schema_check'):
+        await ensure_schema()
+    if config['connections']['default']['engine'] == SQLITE_ENGINE:
+        with startup_timer.phase('pragma_check'):
+            for name in config['connections']:
+                await check_pragmas(pragmas, name)
+    return config
 
 
 async def close_database():
@@ -44,6 +72,20 @@ def create_app() -> FastAPI:
     '''
     创建FastAPI实例
     '''
+    from fastapi import Request, Response
+    from fastapi.middleware.asyncexitstack import AsyncExitStackMiddleware
+    from app.interface.api.v1.auth_router import router as auth_router
+    from app.interface.api.v1.batch_router import router as batch_router
+    from app.interface.api.v1.order_router import router as order_router
+    from app.interface.batch import BatchDispatcher
+    from app.interface.metrics import (
+        CONTENT_TYPE, MetricsRegistry, collect_admission, collect_compression, collect_container
+    )
+    from app.interface.middleware import (
+        AdmissionControlMiddleware, AdmissionGate, CompressionMiddleware, CompressionStats, DependencyTimingMiddleware,
+        MetricsMiddleware, QueryInspectionMiddleware
+    )
+
     app = FastAPI(
         title = settings.app_name,
         version = settings.app_version,
@@ -51,20 +93,109 @@ def create_app() -> FastAPI:
         lifespan = lifespan
     )
 
-    # 导入并注册路由
+    # 注册中间件（后添加的在外层）
+    app.add_middleware(DependencyTimingMiddleware)
+    if settings.sql_inspection_enabled:
+        app.add_middleware(QueryInspectionMiddleware, threshold=settings.sql_n_plus_one_threshold)
+    if settings.admission_enabled:
+        queue_timeout = settings.admission_queue_timeout_ms / 1000
+        gates = {
+            '/api/v1/auth': AdmissionGate('auth', settings.admission_auth_concurrency, settings.admission_queue_size, queue_timeout),
+            '/api/v1/orders': AdmissionGate('orders', settings.admission_orders_concurrency, settings.admission_queue_size, queue_timeout),
+            # 导出是长时间的流式响应，单独限流，也不把它的处理时长计入普通订单请求的排队估算
+            '/api/v1/orders/export': AdmissionGate(
+                'orders_export', settings.admission_export_concurrency, settings.admission_export_queue_size, queue_timeout
+            ),
+        }
+        app.state.admission_gates = gates
+        app.add_middleware(AdmissionControlMiddleware, gates=gates)
+    if settings.batch_enabled:
+        # 子请求直接交给路由，不重复经过外层中间件（路由依赖的AsyncExitStack除外）；
+        # 开启准入控制时仍按子请求路径占用对应的并发名额
+        target = AsyncExitStackMiddleware(app.router)
+        if settings.admission_enabled:
+            target = AdmissionControlMiddleware(target, gates=gates)
+        app.state.batch_dispatcher = BatchDispatcher(
+            target,
+            batch_path='/api/v1/batch',
+            max_requests=settings.batch_max_requests,
+            max_concurrency=settings.batch_max_concurrency
+        )
+    if settings.compression_enabled:
+        # 在准入控制之外压缩，压缩耗时不占用路由组的并发名额；批量请求的子请求不单独压缩
+        app.state.compression_stats = CompressionStats()
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.compression_minimum_size,
+            level=settings.compression_level,
+            stats=app.state.compression_stats
+        )
+    if settings.metrics_enabled:
+        # 最外层，耗时包含准入排队
+        registry = MetricsRegistry()
+        registry.add_collector(lambda: collect_admission(getattr(app.state, 'admission_gates', {})))
+        registry.add_collector(lambda: collect_compression(getattr(app.state, 'compression_stats', None)))
+        registry.add_collector(lambda: collect_container(getattr(app.state, 'container', None)))
+        app.state.metrics = registry
+        app.add_middleware(MetricsMiddleware, registry=registry)
+
+        @app.get('/metrics', include_in_schema=False)
+        async def metrics(request:Request) -> Response:
+            '''
+            Prometheus指标
+            '''
+            return Response(content=request.app.state.metrics.render(), media_type=CONTENT_TYPE)
+
+    # 注册路由
     app.include_router(auth_router, prefix="/api/v1")
     app.include_router(order_router, prefix="/api/v1")
+    if settings.batch_enabled:
+        app.include_router(batch_router, prefix="/api/v1")
+    app.get("/")(root)
     return app
 
-app = create_app()
-
-@app.get("/")
 async def root():
     '''
     根路由
     '''
     return {"message": "欢迎使用 FastAPI DDD 应用","version": settings.app_version,"docs": "/docs"}
 
+def __getattr__(name:str):
+    '''
+    首次访问 main.app 时才创建应用（uvicorn 'main:app' 同样通过属性访问取得应用）
+    '''
+    if name == 'app':
+        if 'app' not in globals():
+            with startup_timer.phase('create_app'):
+                globals()['app'] = create_app()
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+async def profile_startup(path:str = '/api/v1/orders/?user_id=1') -> None:
+    '''
+    打印冷启动耗时：导入（新进程中测量）、应用创建、lifespan各阶段和第一个请求
+    '''
+    from app.interface.startup import asgi_get, import_breakdown
+
+    print('导入耗时（累计，只列出5ms以上的模块；包括创建应用时才导入的路由和处理器）:')
+    for module, seconds in import_breakdown('import main; main.app'):
+        if seconds < 0.005:
+            continue
+        print(f'  {module:<40} {seconds * 1000:8.1f} ms')
+
+    app = __getattr__('app')
+    async with app.router.lifespan_context(app):
+        with startup_timer.phase('first_request'):
+            status = await asgi_get(app, path)
+    print(f'初始化耗时（第一个请求 GET {path} -> {status}）:')
+    for phase, seconds in startup_timer.phases.items():
+        print(f'  {phase:<40} {seconds * 1000:8.1f} ms')
+    print(f'  {"total":<40} {sum(startup_timer.phases.values()) * 1000:8.1f} ms')
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run('main:app', host='127.0.0.1', port=8000, reload=settings.debug)
+    if '--profile-startup' in sys.argv:
+        import asyncio
+        asyncio.run(profile_startup())
+    else:
+        import uvicorn
+        uvicorn.run('main:app', host='127.0.0.1', port=8000, reload=settings.debug)
@@ -0,0 +1,255 @@
+'''
+生产环境多进程启动器：主进程绑定监听socket后fork出多个worker，worker在同一个socket上accept
+
+在ddd目录下运行：
+    python serve.py --workers 4 --loop uvloop --http httptools
+
+主进程不导入应用也不打开数据库，每个worker在自己的lifespan中建立SQLite连接并执行PRAGMA。
+
+以下状态保存在进程内，每个worker各有一份，互不同步：
+    用户缓存            其他worker上的修改要等本worker的条目过期（user_cache_ttl）才可见
+    用户名布隆过滤器    只记录本worker的注册，漏判由数据库唯一约束兜底
+    会话令牌deny-list   退出登录只在处理该请求的worker上生效，其他worker上令牌直到过期仍有效
+    已校验令牌缓存、组提交队列、事件总线、准入控制闸门、/metrics的计数
+订单列表的ETag由数据库中的版本戳生成，不依赖进程内状态，各worker返回的ETag一致。
+
+信号：
+    SIGHUP          逐个替换worker：新worker启动完成后再让旧worker优雅退出
+    SIGTERM/SIGINT  所有worker停止accept，处理完进行中的请求后退出
+'''
+import argparse
+import importlib.util
+import logging
+import os
+import select
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+from config.settngs import settings
+
+logger = logging.getLogger('serve')
+
+# worker启动后存活不足该秒数就退出，视为启动失败，重启前等待同样时间，避免反复fork
+MIN_WORKER_UPTIME = 1.0
+
+
+def cpu_count() -> int:
+    '''
+    当前进程可用的CPU核数
+    '''
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def bind_socket(host:str, port:int, backlog:int = 2048) -> socket.socket:
+    '''
+    在主进程中绑定监听socket，fork出的worker继承同一个文件描述符
+    '''
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class WorkerServer(uvicorn.Server):
+    '''
+    lifespan启动完成并开始监听后通过管道通知主进程
+    '''
+    def __init__(self, config:uvicorn.Config, ready_fd:int):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def startup(self, sockets:list[socket.socket] | None = None) -> None:
+        await super().startup(sockets)
+        try:
+            if self.started:
+                os.write(self.ready_fd, b'1')
+        except BrokenPipeError:
+            # 主进程没有等待这个worker（初始启动或异常重启），已关闭读端
+            pass
+        finally:
+            os.close(self.ready_fd)
+
+    def install_signal_handlers(self) -> None:
+        # 主进程收到的SIGHUP不应影响worker
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        super().install_signal_handlers()
+
+
+class Arbiter:
+    '''
+    主进程：维持worker数量、转发关闭信号、处理滚动重启
+    '''
+    def __init__(self, sock:socket.socket, args:argparse.Namespace):
+        self.sock = sock
+        self.args = args
+        self.workers: dict[int, float] = {}   # pid -> 启动时间
+        self.retiring: set[int] = set()
+        self.reload_requested = False
+        self.stopping = False
+
+    def run(self) -> None:
+        '''主循环'''
+        signal.signal(signal.SIGHUP, self._on_reload)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        logger.info('监听 %s:%d，启动 %d 个worker（loop=%s http=%s）',
+                    self.args.host, self.args.port, self.args.workers, self.args.loop, self.args.http)
+        for _ in range(self.args.workers):
+            self.spawn()
+        while not self.stopping:
+            self.reap()
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload()
+            missing = self.args.workers - (len(self.workers) - len(self.retiring))
+            for _ in range(max(missing, 0)):
+                self.spawn()
+            time.sleep(0.2)
+        self.stop()
+
+    def spawn(self, wait_ready:bool = False) -> int | None:
+        '''fork一个worker；wait_ready时等待其启动完成，启动失败返回None'''
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            code = 0
+            try:
+                self._run_worker(write_fd)
+            except BaseException:
+                logger.exception('worker异常退出')
+                code = 1
+            finally:
+                os._exit(code)
+        os.close(write_fd)
+        self.workers[pid] = time.monotonic()
+        try:
+            if not wait_ready:
+                return pid
+            ready, _, _ = select.select([read_fd], [], [], self.args.startup_timeout)
+            if ready and os.read(read_fd, 1) == b'1':
+                return pid
+            logger.error('worker %d 未能在 %ds 内启动', pid, self.args.startup_timeout)
+            self.retire(pid)
+            return None
+        finally:
+            os.close(read_fd)
+
+    def _run_worker(self, ready_fd:int) -> None:
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, signal.SIG_DFL)
+        config = uvicorn.Config(
+            'main:app',
+            loop=self.args.loop,
+            http=self.args.http,
+            timeout_graceful_shutdown=self.args.graceful_timeout,
+            access_log=self.args.access_log,
+        )
+        WorkerServer(config, ready_fd).run(sockets=[self.sock])
+
+    def retire(self, pid:int) -> None:
+        '''让worker优雅退出：停止accept，处理完进行中的请求并执行lifespan关闭'''
+        self.retiring.add(pid)
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+    def reap(self) -> None:
+        '''回收已退出的worker'''
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            started = self.workers.pop(pid, None)
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+                continue
+            if started is not None and not self.stopping:
+                logger.warning('worker %d 意外退出（status=%d）', pid, os.waitstatus_to_exitcode(status))
+                if time.monotonic() - started < MIN_WORKER_UPTIME:
+                    time.sleep(MIN_WORKER_UPTIME)
+
+    def reload(self) -> None:
+        '''滚动重启：每启动好一个新worker就让一个旧worker退出，始终保持有worker在accept'''
+        old = [pid for pid in self.workers if pid not in self.retiring]
+        logger.info('收到SIGHUP，替换 %d 个worker', len(old))
+        for pid in old:
+            if self.stopping:
+                return
+            if self.spawn(wait_ready=True) is None:
+                logger.error('新worker启动失败，保留剩余的旧worker')
+                return
+            self.retire(pid)
+
+    def stop(self) -> None:
+        '''通知所有worker优雅退出，超时后强制结束'''
+        for pid in list(self.workers):
+            self.retire(pid)
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in self.workers:
+            logger.warning('worker %d 未在期限内退出，强制结束', pid)
+            os.kill(pid, signal.SIGKILL)
+        logger.info('已停止')
+
+    def _on_reload(self, signum, frame) -> None:
+        self.reload_requested = True
+
+    def _on_stop(self, signum, frame) -> None:
+        self.stopping = True
+
+
+def parse_args(argv:list[str] | None = None) -> argparse.Namespace:
+    '''
+    解析命令行参数，默认值来自配置
+    '''
+    parser = argparse.ArgumentParser(description='多进程启动FastAPI DDD应用')
+    parser.add_argument('--host', default=settings.serve_host)
+    parser.add_argument('--port', type=int, default=settings.serve_port)
+    parser.add_argument('--workers', type=int, default=settings.serve_workers, help='0表示每个CPU核一个worker')
+    parser.add_argument('--loop', choices=['auto', 'asyncio', 'uvloop'], default=settings.serve_loop)
+    parser.add_argument('--http', choices=['auto', 'h11', 'httptools'], default=settings.serve_http)
+    parser.add_argument('--graceful-timeout', type=int, default=settings.serve_graceful_timeout)
+    parser.add_argument('--startup-timeout', type=int, default=60, help='滚动重启时等待新worker启动的秒数')
+    parser.add_argument('--access-log', action='store_true')
+    args = parser.parse_args(argv)
+    # 显式指定的实现必须已安装，否则每个worker都会在启动时失败
+    for option, module in (('loop', 'uvloop'), ('http', 'httptools')):
+        if getattr(args, option) == module and importlib.util.find_spec(module) is None:
+            parser.error(f'--{option} {module} 需要先安装 {module}')
+    if args.workers <= 0:
+        args.workers = cpu_count()
+    return args
+
+def main(argv:list[str] | None = None) -> None:
+    '''
+    入口
+    '''
+    if not hasattr(os, 'fork'):
+        sys.exit('serve.py 依赖 fork，Windows 上请直接使用 uvicorn --workers')
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s [%(process)d] %(name)s: %(message)s')
+    args = parse_args(argv)
+    sock = bind_socket(args.host, args.port)
+    try:
+        Arbiter(sock, args).run()
+    finally:
+        sock.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+'''
+会话令牌签发、校验和吊销的测试
+'''
+import base64
+import unittest
+
+from app.infrastructure.security.session_token import HmacSessionTokenService
+
+SECRET_KEY = 'k' * 32
+
+
+class FakeClock:
+    '''
+    可手动推进的时钟
+    '''
+    def __init__(self, now:float = 1_700_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class HmacSessionTokenServiceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.service = HmacSessionTokenService(SECRET_KEY, ttl=60, clock=self.clock)
+
+    def test_round_trip(self):
+        token = self.service.issue(42, 'alice')
+        claims = self.service.verify(token)
+        self.assertEqual((claims.user_id, claims.username), (42, 'alice'))
+        self.assertEqual(claims.expires_at - claims.issued_at, 60)
+        # 第二次校验命中缓存，结果相同
+        self.assertEqual(self.service.verify(token), claims)
+
+    def test_tampered_signature_is_rejected(self):
+        token = self.service.issue(42, 'alice')
+        signed, _, signature = token.rpartition('.')
+        forged = signed + '.' + ('A' if signature[0] != 'A' else 'B') + signature[1:]
+        self.assertIsNone(self.service.verify(forged))
+        self.assertEqual(self.service.stats.invalid, 1)
+
+    def test_tampered_payload_is_rejected(self):
+        token = self.service.issue(42, 'alice')
+        version, payload, signature = token.split('.')
+        raw = base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)).replace(b'42:', b'1:', 1)
+        forged_payload = base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+        self.assertIsNone(self.service.verify(f'{version}.{forged_payload}.{signature}'))
+
+    def test_token_signed_with_other_key_is_rejected(self):
+        other = HmacSessionTokenService('x' * 32, ttl=60, clock=self.clock)
+        self.assertIsNone(self.service.verify(other.issue(42, 'alice')))
+
+    def test_malformed_tokens_are_rejected(self):
+        for token in ('', '.', 'v1', 'v1.', 'v1..', 'v2.abc.def', 'v1.é.x', 'not a token'):
+            with self.subTest(token=token):
+                self.assertIsNone(self.service.verify(token))
+
+    def test_expired_token_is_rejected(self):
+        token = self.service.issue(42, 'alice')
+        self.assertIsNotNone(self.service.verify(token))
+        self.clock.now += 60
+        # 已缓存的令牌过期后同样拒绝
+        self.assertIsNone(self.service.verify(token))
+        self.assertEqual(self.service.stats.expired, 1)
+
+    def test_revoked_token_is_rejected(self):
+        token = self.service.issue(42, 'alice')
+        other = self.service.issue(42, 'alice')
+        claims = self.service.verify(token)
+        self.service.revoke(claims)
+        self.assertIsNone(self.service.verify(token))
+        self.assertEqual(self.service.stats.revoked, 1)
+        # 只吊销这一个令牌
+        self.assertIsNotNone(self.service.verify(other))
+
+    def test_revocation_is_dropped_after_expiry(self):
+        claims = self.service.verify(self.service.issue(42, 'alice'))
+        self.clock.now += 61
+        self.service.revoke(claims)
+        self.assertEqual(len(self.service.revoked), 0)
+
+    def test_username_containing_separator(self):
+        for username in ('a:b', ':', 'x:1:2:3:4', '用户:名'):
+            with self.subTest(username=username):
+                claims = self.service.verify(self.service.issue(7, username))
+                self.assertEqual((claims.user_id, claims.username), (7, username))
+
+    def test_weak_secret_key_is_refused(self):
+        for key in ('your-secret-key', 'short', 'k' * 31):
+            with self.subTest(key=key), self.assertRaises(ValueError):
+                HmacSessionTokenService(key)
+        with self.assertRaises(ValueError):
+            HmacSessionTokenService('', allow_weak_key=True)
+
+    def test_weak_secret_key_is_allowed_in_debug(self):
+        with self.assertLogs('app.infrastructure.security.session_token', 'WARNING'):
+            service = HmacSessionTokenService('your-secret-key', allow_weak_key=True)
+        self.assertIsNotNone(service.verify(service.issue(1, 'alice')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+'''
+用户读穿透缓存的测试
+'''
+import asyncio
+import unittest
+from typing import Optional
+
+from app.domain.shared.vo import UserID
+from app.domain.user.entity import User
+from app.infrastructure.cache.lru_cache import TTLLRUCache
+from app.infrastructure.repository.user_cached import CachedUserRepository
+
+
+class FakeUserRepository:
+    '''
+    内存中的用户仓储，设置gate后查询会等待它，用来制造并发
+    '''
+    def __init__(self):
+        self.users: dict[str, User] = {}
+        self.queries = 0
+        self.gate: Optional[asyncio.Event] = None
+
+    async def _wait(self) -> None:
+        self.queries += 1
+        if self.gate:
+            await self.gate.wait()
+
+    async def find_by_username(self, username:str) -> Optional[User]:
+        user = self.users.get(username)
+        await self._wait()
+        return User(user.id, user.username, user.password) if user else None
+
+    async def find_by_id(self, user_id:UserID) -> Optional[User]:
+        user = next((user for user in self.users.values() if user.id == user_id), None)
+        await self._wait()
+        return User(user.id, user.username, user.password) if user else None
+
+    async def save(self, user:User) -> User:
+        saved_user = User(user.id or UserID(len(self.users) + 1), user.username, user.password)
+        self.users = {name: other for name, other in self.users.items() if other.id != saved_user.id}
+        self.users[user.username] = saved_user
+        return saved_user
+
+    async def save_many(self, users:list[User]) -> list[User]:
+        return [await self.save(user) for user in users]
+
+    async def delete(self, user_id:UserID) -> bool:
+        count = len(self.users)
+        self.users = {name: user for name, user in self.users.items() if user.id != user_id}
+        return len(self.users) < count
+
+
+class CachedUserRepositoryTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.inner = FakeUserRepository()
+        self.repository = CachedUserRepository(self.inner)
+
+    async def test_hit_after_miss(self):
+        await self.repository.save(User(None, 'alice', 'hash'))
+        await self.repository.find_by_username('alice')
+        await self.repository.find_by_username('alice')
+        self.assertEqual(self.inner.queries, 1)
+
+    async def test_stale_read_is_not_cached_after_concurrent_save(self):
+        user = await self.repository.save(User(None, 'alice', 'old'))
+        self.inner.gate = asyncio.Event()
+        load = asyncio.create_task(self.repository.find_by_username('alice'))
+        await asyncio.sleep(0)
+        await self.repository.save(User(user.id, 'alice', 'new'))
+        self.inner.gate.set()
+        self.assertEqual((await load).password, 'old')
+        self.assertEqual((await self.repository.find_by_username('alice')).password, 'new')
+        self.assertEqual((await self.repository.find_by_id(user.id)).password, 'new')
+
+    async def test_negative_read_is_not_cached_after_concurrent_register(self):
+        self.inner.gate = asyncio.Event()
+        load = asyncio.create_task(self.repository.find_by_username('alice'))
+        await asyncio.sleep(0)
+        await self.repository.save(User(None, 'alice', 'hash'))
+        self.inner.gate.set()
+        self.assertIsNone(await load)
+        self.assertIsNotNone(await self.repository.find_by_username('alice'))
+
+    async def test_register_does_not_invalidate_unrelated_load(self):
+        await self.inner.save(User(None, 'alice', 'hash'))
+        self.inner.gate = asyncio.Event()
+        load = asyncio.create_task(self.repository.find_by_username('alice'))
+        await asyncio.sleep(0)
+        await self.repository.save(User(None, 'bob', 'hash'))
+        await self.repository.save_many([User(None, 'carol', 'hash'), User(None, 'dave', 'hash')])
+        self.inner.gate.set()
+        await load
+        await self.repository.find_by_username('alice')
+        self.assertEqual(self.inner.queries, 1)
+
+    async def test_delete_drops_username_entry_after_id_entry_is_evicted(self):
+        repository = CachedUserRepository(self.inner, max_size=3)
+        user = await self.inner.save(User(None, 'alice', 'hash'))
+        await self.inner.save(User(None, 'bob', 'hash'))
+        await repository.find_by_username('alice')
+        # 'alice'的用户名条目保持最近使用，ID条目先被淘汰
+        await repository.find_by_username('alice')
+        await repository.find_by_id(UserID(2))
+        self.assertEqual(repository.cache.get(('username', 'alice')).id, user.id)
+        self.assertTrue(TTLLRUCache.is_missing(repository.cache.get(('id', user.id.value))))
+        await repository.delete(user.id)
+        self.assertIsNone(await repository.find_by_username('alice'))
+
+    async def test_rename_drops_old_username_entry(self):
+        user = await self.repository.save(User(None, 'alice', 'hash'))
+        await self.repository.find_by_id(user.id)
+        await self.repository.save(User(user.id, 'alicia', 'hash'))
+        self.assertIsNone(await self.repository.find_by_username('alice'))
+        self.assertEqual((await self.repository.find_by_id(user.id)).username, 'alicia')
+
+    async def test_negative_results_can_be_disabled(self):
+        repository = CachedUserRepository(self.inner, negative_ttl=0)
+        self.assertIsNone(await repository.find_by_username('alice'))
+        self.assertIsNone(await repository.find_by_username('alice'))
+        self.assertEqual(self.inner.queries, 2)
+
+    async def test_loading_state_is_released(self):
+        self.inner.gate = asyncio.Event()
+        loads = [asyncio.create_task(self.repository.find_by_username('alice')) for _ in range(3)]
+        await asyncio.sleep(0)
+        self.inner.gate.set()
+        await asyncio.gather(*loads)
+        self.assertEqual(self.repository._loading, {})
+
+    async def test_username_map_follows_evictions(self):
+        repository = CachedUserRepository(self.inner, max_size=4)
+        for i in range(10):
+            await self.inner.save(User(None, f'user{i}', 'hash'))
+            await repository.find_by_username(f'user{i}')
+        self.assertLessEqual(len(repository._usernames), 4)
+        for user_id, username in repository._usernames.items():
+            self.assertEqual(repository.cache.get(('username', username)).id.value, user_id)
+
+
+if __name__ == '__main__':
+    unittest.main()